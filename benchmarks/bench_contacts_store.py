@@ -0,0 +1,105 @@
+"""
+Campaign bookkeeping against a contact history of 100k volunteers, before and after the ContactsStore.
+
+"before" is what csv_util used to do for every recipient: download contacts_date.csv and scan it for the check,
+and download, scan and upload it again after the send. "after" goes through the ContactsStore, on the local storage
+which pulls the file once and pushes the changes in the background. Both run on the in-memory Drive of
+tests.fakedrive.
+
+Run from the repository root: python -m benchmarks.bench_contacts_store --contacts 100000 --recipients 200
+"""
+import argparse
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from tests.fakedrive import FakeDriveService
+from google_drive.google_api_services import GoogleDriveManager
+from models.contactsstore import ContactsStore
+from storage.storagemanager import StorageManager
+from storage.storageinterface import TABLES
+
+CONTACTS_FILE_NAME = TABLES['contacts']
+
+
+def contacts_csv(contacts: int) -> bytes:
+    file_content = io.StringIO()
+    writer = csv.writer(file_content)
+    first_day = date.today() - timedelta(days=720)
+    for i in range(contacts):
+        writer.writerow([str(1000000 + i), (first_day + timedelta(days=i % 720)).strftime('%Y-%m-%d')])
+    return file_content.getvalue().encode('utf-8')
+
+
+def scan_contacts(drive_manager: GoogleDriveManager, volunteer_id: str) -> (list, Optional[date]):
+    file_id = drive_manager.find_file_id_by_name(CONTACTS_FILE_NAME)
+    rows = list(csv.reader(io.StringIO(drive_manager.download_file_content(file_id).decode('utf-8'))))
+    for row in rows:
+        if len(row) >= 2 and row[0] == volunteer_id:
+            return rows, datetime.strptime(row[1], '%Y-%m-%d').date()
+    return rows, None
+
+
+def campaign_before(drive_manager: GoogleDriveManager, recipients: List[str]) -> None:
+    for volunteer_id in recipients:
+        scan_contacts(drive_manager, volunteer_id)
+        rows, _ = scan_contacts(drive_manager, volunteer_id)
+        rows.append([volunteer_id, date.today().strftime('%Y-%m-%d')])
+        file_content = io.StringIO()
+        csv.writer(file_content).writerows(rows)
+        drive_manager.upload_file_content(file_content.getvalue().encode('utf-8'), CONTACTS_FILE_NAME)
+
+
+def campaign_after(drive_manager: GoogleDriveManager, recipients: List[str]) -> None:
+    StorageManager.configure(os.path.join(tempfile.mkdtemp(prefix='nlvoorelkaar-bench-'), 'storage.sqlite3'),
+                             drive_manager)
+    contacts_store = ContactsStore()
+    for volunteer_id in recipients:
+        if not contacts_store.was_contacted_recently(volunteer_id):
+            contacts_store.record_contact(volunteer_id)
+    StorageManager.get_sync().flush()
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark the ContactsStore against scanning contacts_date.csv')
+    parser.add_argument('--contacts', type=int, default=100000)
+    parser.add_argument('--recipients', type=int, default=200)
+    options = parser.parse_args(arguments)
+
+    drive = FakeDriveService()
+    drive_manager = GoogleDriveManager(service=drive)
+    drive_manager.wait_until_ready()
+    content = contacts_csv(options.contacts)
+    recipients = [str(1000000 + options.contacts + i) for i in range(options.recipients)]
+    print(f'{options.contacts} contacts ({len(content) / 1024 / 1024:.1f} MB), {options.recipients} recipients')
+    print(f'{"":<10}{"total (s)":>12}{"per recipient (ms)":>21}{"uploaded (MB)":>16}{"drive calls":>14}')
+
+    for name in ('before', 'after'):
+        drive.put_file(CONTACTS_FILE_NAME, content, drive_manager.folder_id)
+        drive_manager.forget_file(CONTACTS_FILE_NAME)
+        drive.calls.clear()
+        drive.uploaded_bytes = 0
+        started = time.perf_counter()
+        if name == 'before':
+            campaign_before(drive_manager, recipients)
+        else:
+            campaign_after(drive_manager, recipients)
+        elapsed = time.perf_counter() - started
+        print(f'{name:<10}{elapsed:>12.2f}{elapsed / options.recipients * 1000:>21.3f}'
+              f'{drive.uploaded_bytes / 1024 / 1024:>16.1f}{sum(drive.calls.values()):>14}')
+
+    contacts_store = ContactsStore()
+    lookups = [str(1000000 + i) for i in range(0, options.contacts, max(1, options.contacts // 10000))]
+    started = time.perf_counter()
+    for volunteer_id in lookups:
+        contacts_store.get_last_contact(volunteer_id)
+    print(f'lookup in the store: {(time.perf_counter() - started) / len(lookups) * 1e6:.2f} us')
+    StorageManager.close()
+
+
+if __name__ == '__main__':
+    main()
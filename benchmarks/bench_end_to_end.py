@@ -0,0 +1,166 @@
+"""
+End-to-end throughput of search, messaging and the reminder scan, against the local stand-in site.
+
+Everything runs in process: the SessionManager sends its requests to benchmarks.fakesite through a WSGIAdapter and
+the GoogleDriveManager works on tests.fakedrive. The delays between messages and reminders are virtualised,
+time.sleep advances a virtual clock instead of waiting, which is reported next to the wall time.
+
+For every operation the report lists the requests per route on the site, the Drive calls, the wall time and the
+peak memory traced while it ran.
+
+Run from the repository root: python -m benchmarks.bench_end_to_end --offers 1000 --chats 200 --recipients 10
+
+These are the defaults and take about a minute and a half. The time grows with the chats, most of it goes to the
+reminder scans, so 10000 offers and 2000 chats take well over ten minutes.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, List, Optional
+
+from tests.fakedrive import FakeDriveService
+from benchmarks.fakesite import FakeSite, WSGIAdapter
+
+
+class VirtualClock:
+    """
+    Replaces time.sleep while active, adding the requested delays up instead of waiting them out. The delays of all
+    the clocks move the virtual time of monotonic forward, which the RateLimiter runs on.
+    """
+    total_slept = 0.0
+
+    def __init__(self):
+        self.slept = 0.0
+        self.original_sleep = None
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += max(0.0, seconds)
+        VirtualClock.total_slept += max(0.0, seconds)
+
+    @staticmethod
+    def monotonic() -> float:
+        return time.perf_counter() + VirtualClock.total_slept
+
+    def __enter__(self):
+        self.original_sleep = time.sleep
+        time.sleep = self.sleep
+        return self
+
+    def __exit__(self, *exc_info):
+        time.sleep = self.original_sleep
+
+
+class Notifier:
+    """
+    Stands in for the views, counting the notifications it receives.
+    """
+
+    def __init__(self):
+        self.notifications = Counter()
+
+    def __getattr__(self, name: str):
+        if not name.startswith('notify'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.notifications.update([name])
+
+
+class Benchmark:
+
+    def __init__(self, site: FakeSite, drive: FakeDriveService):
+        self.site = site
+        self.drive = drive
+        self.rows = []
+
+    def run(self, name: str, operation: Callable[[], object]):
+        self.site.reset_counters()
+        drive_calls = Counter(self.drive.calls)
+        tracemalloc.start()
+        with VirtualClock() as clock:
+            started = time.perf_counter()
+            result = operation()
+            wall_time = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        site_requests = Counter(self.site.requests)
+        drive_requests = Counter(self.drive.calls)
+        drive_requests.subtract(drive_calls)
+        self.rows.append((name, site_requests, +drive_requests, wall_time, clock.slept, peak))
+        return result
+
+    def report(self) -> None:
+        print(f'{"operation":<22}{"site":>8}{"drive":>8}{"wall (s)":>11}{"virtual (s)":>13}{"peak (MB)":>11}')
+        for name, site_requests, drive_requests, wall_time, slept, peak in self.rows:
+            print(f'{name:<22}{sum(site_requests.values()):>8}{sum(drive_requests.values()):>8}'
+                  f'{wall_time:>11.2f}{slept:>13.0f}{peak / 1024 / 1024:>11.1f}')
+        print()
+        for name, site_requests, drive_requests, *_ in self.rows:
+            routes = ', '.join(f'{route} {count}' for route, count in site_requests.most_common())
+            calls = ', '.join(f'{call} {count}' for call, count in drive_requests.most_common())
+            print(f'{name}: {routes or "-"} | {calls or "-"}')
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='End-to-end benchmark against the local stand-in site')
+    parser.add_argument('--offers', type=int, default=1000)
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--recipients', type=int, default=10)
+    options = parser.parse_args(arguments)
+
+    directory = tempfile.mkdtemp(prefix='nlvoorelkaar-bench-')
+    database_path = os.path.join(directory, 'result_cache.sqlite3')
+
+    from models.resultcache import ResultCache
+    from models.searchhistory import SearchHistory
+    from models.profileidcache import ProfileIdCache
+    from models.sessionmanager import SessionManager
+    from storage.storagemanager import StorageManager
+    from google_drive.google_api_services import GoogleDriveManager
+    from services.volunteerservice import VolunteerService
+    from services.messagingservice import MessagingService
+    from services.reminderservice import ReminderService
+    from services.ratelimiter import RateLimiter
+    from controllers.logincontroller import LoginController
+
+    site = FakeSite(options.offers, options.chats)
+    drive = FakeDriveService()
+    ResultCache(path=database_path)
+    SearchHistory(path=database_path)
+    ProfileIdCache(path=os.path.join(directory, 'profile_cache.sqlite3'))
+    RateLimiter(clock=VirtualClock.monotonic)
+    SessionManager.use_transport(WSGIAdapter(site))
+    benchmark = Benchmark(site, drive)
+    drive_manager = benchmark.run('drive construct', lambda: GoogleDriveManager(service=drive))
+    benchmark.run('drive ready', drive_manager.wait_until_ready)
+    benchmark.run('storage open', lambda: StorageManager.configure(os.path.join(directory, 'storage.sqlite3'),
+                                                                   drive_manager))
+    search = ({}, {'Amsterdam': (363, 'municipality', 'Gemeente')}, 'Amsterdam', 0)
+
+    def crawl(get_volunteers: Callable):
+        ResultCache().clear()
+        return get_volunteers()
+
+    benchmark.run('login', lambda: LoginController().login('user@example.com', 'password'))
+    volunteers_ids = benchmark.run('search sequential',
+                                   lambda: crawl(lambda: VolunteerService.get_volunteers(Notifier(), *search)))
+    benchmark.run('search parallel',
+                  lambda: crawl(lambda: VolunteerService.get_volunteers_parallel(Notifier(), *search)))
+    benchmark.run('search stream', lambda: crawl(lambda: list(VolunteerService.iter_volunteers(None, *search))))
+    benchmark.run('search cached', lambda: VolunteerService.get_volunteers(Notifier(), *search))
+    benchmark.run('search delta first', lambda: VolunteerService.get_volunteers_delta(Notifier(), *search))
+    benchmark.run('search delta again', lambda: VolunteerService.get_volunteers_delta(Notifier(), *search))
+    benchmark.run('count', lambda: crawl(lambda: VolunteerService.get_amount_of_volunteer(*search)))
+    benchmark.run('messaging', lambda: MessagingService().send_messages(
+        Notifier(), 'user@example.com', 'password', 'Hallo', '0612345678', volunteers_ids[:options.recipients]))
+    benchmark.run('reminder scan', lambda: ReminderService().run_reminder_service('3', 'Hallo'))
+    benchmark.run('reminder scan again', lambda: ReminderService().run_reminder_service('0', 'Hallo'))
+
+    print(f'{options.offers} offers, {options.chats} chats, {options.recipients} recipients, '
+          f'{len(volunteers_ids)} volunteers found')
+    benchmark.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Parse time per page type, before and after utils.html_parser.
+
+"before" is a full BeautifulSoup tree built with html.parser, as every call site used to do. "after" is
+parse_html with the strainer the call site declares, on the fastest installed backend.
+
+Run from the repository root: python -m benchmarks.bench_html_parser
+"""
+import timeit
+
+from bs4 import BeautifulSoup
+
+from benchmarks.pages import render_search_page, render_offer_page, render_inbox_page, render_conversation_page, \
+    render_login_page, render_profile_page
+from utils.html_parser import parse_html, PARSER_BACKEND, VOLUNTEER_COUNT, MESSAGE_FORM, OFFER_PROFILE_LINK, \
+    INBOX_CONVERSATIONS, CONVERSATION_METAS, LOGIN_FORM, PROFILE_FORM
+
+PAGES = [
+    ('search results', render_search_page([str(100000 + i) for i in range(23)], 4321, 'abc123', True), None),
+    ('search count', render_search_page([str(100000 + i) for i in range(23)], 4321, 'abc123', True),
+     VOLUNTEER_COUNT),
+    ('offer profile link', render_offer_page('100001', '555', 'token', '1700000000'), OFFER_PROFILE_LINK),
+    ('offer message form', render_offer_page('100001', '555', 'token', '1700000000'), MESSAGE_FORM),
+    ('inbox', render_inbox_page([(str(i), f'Naam{i}', str(100000 + i)) for i in range(20)], 1, 5),
+     INBOX_CONVERSATIONS),
+    ('conversation', render_conversation_page('Jan', '100001', [('Jan', '01.02.2024 12:00')] * 30, 'token', '1'),
+     CONVERSATION_METAS),
+    ('login', render_login_page('csrf'), LOGIN_FORM),
+    ('profile', render_profile_page('Piet'), PROFILE_FORM),
+]
+
+
+def _time_per_call(function, repeat: int = 5, number: int = 20) -> float:
+    return min(timeit.repeat(function, repeat=repeat, number=number)) / number
+
+
+def main():
+    print(f'Fast backend: {PARSER_BACKEND}')
+    print(f'{"page":<20}{"size":>10}{"before (ms)":>14}{"full (ms)":>12}{"after (ms)":>13}{"speedup":>10}')
+    for name, html, strainer in PAGES:
+        before = _time_per_call(lambda: BeautifulSoup(html, 'html.parser'))
+        full = _time_per_call(lambda: parse_html(html))
+        after = _time_per_call(lambda: parse_html(html, strainer))
+        print(f'{name:<20}{len(html):>10}{before * 1000:>14.2f}{full * 1000:>12.2f}{after * 1000:>13.2f}'
+              f'{before / after:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
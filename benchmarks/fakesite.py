@@ -0,0 +1,255 @@
+"""
+Local stand-in for nlvoorelkaar.nl, as a WSGI application with generated data.
+
+It serves the pages the application uses: the paginated hulpaanbod search with its key, the location
+autocomplete, inloggen/login_check, the offer pages with their message form, and mijn-pagina/berichten with its
+paginator and conversation pages. Sent messages and reminders are kept, so a send shows up in the inbox like it
+does on the site.
+
+WSGIAdapter plugs the application into the SessionManager without a socket. It answers for any host, so the urls
+of config.settings need no change. Run this module to serve it over HTTP instead:
+
+    python -m benchmarks.fakesite --offers 10000 --chats 2000 --port 8000
+"""
+import argparse
+import io
+import json
+import random
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+from wsgiref.simple_server import make_server
+
+from requests.adapters import BaseAdapter
+
+from benchmarks.pages import render_search_page, render_offer_page, render_inbox_page, render_conversation_page, \
+    render_login_page, render_profile_page
+from models.recordreplay import build_response
+
+RESULTS_PER_PAGE = 23
+CONVERSATIONS_PER_PAGE = 20
+SENDER_NAME = 'Piet'
+FIRST_NAMES = ['Anna', 'Bram', 'Daan', 'Emma', 'Fenna', 'Hugo', 'Iris', 'Joris', 'Lotte', 'Milan', 'Noor', 'Ruben',
+               'Sanne', 'Thijs', 'Vera', 'Wouter']
+PLACES = ['Amsterdam', 'Amstelveen', 'Amersfoort', 'Apeldoorn', 'Arnhem', 'Almere', 'Alkmaar', 'Breda', 'Delft',
+          'Den Haag', 'Deventer', 'Dordrecht', 'Eindhoven', 'Enschede', 'Groningen', 'Haarlem', 'Leiden',
+          'Maastricht', 'Nijmegen', 'Rotterdam', 'Tilburg', 'Utrecht', 'Zwolle']
+
+
+class Conversation:
+
+    def __init__(self, chat_id: str, volunteer_name: str, offer_id: str, messages: List[tuple]):
+        self.chat_id = chat_id
+        self.volunteer_name = volunteer_name
+        self.offer_id = offer_id
+        self.messages = messages
+
+
+class FakeSite:
+    """
+    :param offers: The amount of volunteer offers in the search.
+    :param chats: The amount of conversations in the inbox.
+    :param reply_ratio: The share of conversations in which the volunteer answered.
+    """
+
+    def __init__(self, offers: int = 10000, chats: int = 2000, reply_ratio: float = 0.3, seed: int = 0):
+        generator = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.sent_messages = []
+        self.offer_ids = [str(2000000 - i) for i in range(offers)]
+        self.profile_ids = {offer_id: str(500000 + i) for i, offer_id in enumerate(self.offer_ids)}
+        self.tokens = 0
+        self.conversations = OrderedDict()
+        now = datetime.now()
+        for i in range(chats):
+            offer_id = self.offer_ids[(i * 7) % offers]
+            name = f'{FIRST_NAMES[i % len(FIRST_NAMES)]}{i}'
+            last_message = now - timedelta(days=generator.randint(0, 120), minutes=generator.randint(0, 600))
+            messages = [(SENDER_NAME, last_message - timedelta(days=2))]
+            if generator.random() < reply_ratio:
+                messages.append((name, last_message - timedelta(days=1)))
+            messages.append((SENDER_NAME, last_message))
+            self.conversations[str(100000 + i)] = Conversation(str(100000 + i), name, offer_id, messages)
+
+    def reset_counters(self) -> None:
+        with self.lock:
+            self.requests.clear()
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '/')
+        query = {key: values[-1] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        query_lists = parse_qs(environ.get('QUERY_STRING', ''))
+        form = {}
+        if method == 'POST':
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+            form = {key: values[-1] for key, values in parse_qs(environ['wsgi.input'].read(length).decode()).items()}
+        base = f"{environ['wsgi.url_scheme']}://{environ['HTTP_HOST']}"
+
+        route, status, headers, body = self.__route(method, path, query, query_lists, form, base)
+        with self.lock:
+            self.requests[route] += 1
+        start_response(status, headers)
+        return [body.encode('utf-8')]
+
+    def __route(self, method: str, path: str, query: dict, query_lists: dict, form: dict, base: str):
+        html = [('Content-Type', 'text/html; charset=UTF-8')]
+        if path == '/hulpaanbod/' or path == '/hulpaanbod':
+            return 'search', '200 OK', html, self.__search(query, query_lists)
+        if path.startswith('/hulpaanbod/'):
+            offer_id = path.rsplit('/', 1)[-1]
+            if offer_id not in self.profile_ids:
+                return 'offer', '404 Not Found', html, 'Niet gevonden'
+            if method == 'POST':
+                self.__receive_message(offer_id, form)
+                return 'send message', '200 OK', html, self.__offer(offer_id)
+            return 'offer', '200 OK', html, self.__offer(offer_id)
+        if path == '/location/autocomplete':
+            return 'autocomplete', '200 OK', [('Content-Type', 'application/json')], \
+                json.dumps(self.__autocomplete(query.get('term', '')))
+        if path == '/inloggen':
+            return 'login page', '200 OK', html, render_login_page(self.__token())
+        if path == '/login_check' and method == 'POST':
+            location = f'{base}/mijn-pagina/berichten?authentication=success'
+            return 'login', '302 Found', [('Location', location), ('Set-Cookie', 'PHPSESSID=fake; Path=/')], ''
+        if path == '/uitloggen':
+            return 'logout', '302 Found', [('Location', f'{base}/')], ''
+        if path == '/mijn-pagina/berichten':
+            return 'inbox', '200 OK', html, self.__inbox(query.get('p', '1'))
+        if path.startswith('/mijn-pagina/berichten/'):
+            chat_id = path.rsplit('/', 1)[-1]
+            if chat_id not in self.conversations:
+                return 'conversation', '404 Not Found', html, 'Niet gevonden'
+            if method == 'POST':
+                self.__receive_reminder(chat_id, form)
+                return 'send reminder', '200 OK', html, self.__conversation(chat_id)
+            return 'conversation', '200 OK', html, self.__conversation(chat_id)
+        if path.endswith('/mijn-pagina/profiel'):
+            return 'profile', '200 OK', html, render_profile_page(SENDER_NAME)
+        return 'other', '200 OK', html, render_profile_page(SENDER_NAME) if path == '/' else 'Niet gevonden'
+
+    def __token(self) -> str:
+        with self.lock:
+            self.tokens += 1
+            return f'token{self.tokens}'
+
+    def __search(self, query: dict, query_lists: dict) -> str:
+        offer_ids = self.offer_ids
+        categories = query_lists.get('categories[]')
+        if categories:
+            wanted = {zlib.crc32(category.encode()) % 10 for category in categories}
+            offer_ids = [offer_id for offer_id in offer_ids if int(offer_id) % 10 in wanted]
+        page = int(query.get('p', '1')) if 'key' in query else 1
+        start = (page - 1) * RESULTS_PER_PAGE
+        has_next = start + RESULTS_PER_PAGE < len(offer_ids)
+        return render_search_page(offer_ids[start:start + RESULTS_PER_PAGE], len(offer_ids), 'fakekey', has_next)
+
+    def __offer(self, offer_id: str) -> str:
+        return render_offer_page(offer_id, self.profile_ids[offer_id], self.__token(), '1700000000')
+
+    def __autocomplete(self, term: str) -> list:
+        term = term.lower()
+        return [{'id': i, 'name': place, 'subtitle': 'Gemeente', 'type': 'municipality', 'score': 100 - i}
+                for i, place in enumerate(PLACES) if place.lower().startswith(term)][:10]
+
+    def __inbox(self, page: str) -> str:
+        page = int(page) if page.isdigit() else 1
+        with self.lock:
+            conversations = list(self.conversations.values())
+        page_count = max(1, -(-len(conversations) // CONVERSATIONS_PER_PAGE))
+        start = (page - 1) * CONVERSATIONS_PER_PAGE
+        items = [(conversation.chat_id, conversation.volunteer_name, conversation.offer_id)
+                 for conversation in conversations[start:start + CONVERSATIONS_PER_PAGE]]
+        return render_inbox_page(items, page, page_count)
+
+    def __conversation(self, chat_id: str) -> str:
+        conversation = self.conversations[chat_id]
+        messages = [(author, sent_at.strftime('%d.%m.%Y %H:%M')) for author, sent_at in conversation.messages]
+        return render_conversation_page(conversation.volunteer_name, conversation.offer_id, messages,
+                                        self.__token(), '1700000000')
+
+    def __receive_message(self, offer_id: str, form: dict) -> None:
+        with self.lock:
+            self.sent_messages.append((offer_id, form.get('message[body]')))
+            conversation = next((conversation for conversation in self.conversations.values()
+                                 if conversation.offer_id == offer_id), None)
+            if conversation is None:
+                chat_id = str(100000 + len(self.conversations))
+                conversation = Conversation(chat_id, f'Vrijwilliger{offer_id}', offer_id, [])
+                self.conversations[chat_id] = conversation
+            conversation.messages.append((SENDER_NAME, datetime.now()))
+            self.conversations.move_to_end(conversation.chat_id, last=False)
+
+    def __receive_reminder(self, chat_id: str, form: dict) -> None:
+        with self.lock:
+            self.sent_messages.append((chat_id, form.get('message[body]')))
+            self.conversations[chat_id].messages.append((SENDER_NAME, datetime.now()))
+            self.conversations.move_to_end(chat_id, last=False)
+
+
+class WSGIAdapter(BaseAdapter):
+    """
+    Transport adapter handing the requests of a session to a WSGI application in the same process.
+    """
+
+    def __init__(self, application):
+        super().__init__()
+        self.application = application
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlsplit(request.url)
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'PATH_INFO': unquote(url.path),
+            'QUERY_STRING': url.query,
+            'SERVER_NAME': url.hostname or 'localhost',
+            'SERVER_PORT': str(url.port or (443 if url.scheme == 'https' else 80)),
+            'HTTP_HOST': url.netloc,
+            'CONTENT_LENGTH': str(len(body)),
+            'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+            'wsgi.url_scheme': url.scheme,
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in request.headers.items():
+            environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = status
+            started['headers'] = headers
+
+        content = b''.join(self.application(environ, start_response))
+        status_code, _, reason = started['status'].partition(' ')
+        return build_response(request, int(status_code), content, dict(started['headers']), reason)
+
+    def close(self):
+        pass
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for nlvoorelkaar.nl')
+    parser.add_argument('--offers', type=int, default=10000)
+    parser.add_argument('--chats', type=int, default=2000)
+    parser.add_argument('--port', type=int, default=8000)
+    options = parser.parse_args(arguments)
+    site = FakeSite(options.offers, options.chats)
+    with make_server('127.0.0.1', options.port, site) as server:
+        print(f'Serving on http://127.0.0.1:{options.port}/')
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+HTML renderers mimicking the nlvoorelkaar.nl pages read by the scraping code.
+
+Only the markup the scraping code looks at is reproduced faithfully, the rest is filler sized like the real site
+so that parse times are comparable.
+"""
+from html import escape
+from typing import List, Optional, Tuple
+
+
+def _filler(blocks: int) -> str:
+    return ''.join(
+        f'<div class="site-block"><ul class="nav">'
+        f'{"".join(f"<li><a href=/pagina/{i}-{j}>Link {j}</a></li>" for j in range(8))}'
+        f'</ul><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor.</p></div>'
+        for i in range(blocks))
+
+
+def layout(content: str, title: str = 'NL voor elkaar') -> str:
+    return (f'<!DOCTYPE html><html lang="nl"><head><meta charset="utf-8"><title>{escape(title)}</title>'
+            f'<script>window.dataLayer = window.dataLayer || [];</script>'
+            f'<link rel="stylesheet" href="/build/app.css"></head><body>'
+            f'<header class="site-header">{_filler(12)}</header>'
+            f'<main id="content">{content}</main>'
+            f'<footer class="site-footer">{_filler(20)}</footer>'
+            f'<script src="/build/app.js"></script></body></html>')
+
+
+def format_amount(amount: int) -> str:
+    return f'{amount:,}'.replace(',', '.')
+
+
+def render_search_page(offer_ids: List[str], total: int, key: str, has_next: bool) -> str:
+    cards = ''.join(
+        f'<article class="c-card c-card--offer js-card"><div class="c-card__body">'
+        f'<h3 class="c-card__title">Hulpaanbod {offer_id}</h3><p class="c-card__text">Ik help graag met boodschappen,'
+        f' klussen in en om het huis en gezelschap.</p><ul class="c-card__tags"><li>Zorg</li><li>Klussen</li></ul>'
+        f'<a class="c-card__anchor" id="{offer_id}" href="/hulpaanbod/{offer_id}">Bekijk</a></div></article>'
+        for offer_id in offer_ids)
+    next_link = '<a rel="next" href="?p=next">Volgende</a>' if has_next else ''
+    content = (f'<form class="search-form"><input type="hidden" name="key" value="{key}">'
+               f'<input type="text" name="region[location]"></form>'
+               f'<h1><span class="c-brush-underline"><span class="c-brush-underline__text">{format_amount(total)}'
+               f'</span></span> vrijwilligers gevonden</h1>'
+               f'<div class="c-results">{cards}</div>'
+               f'<section class="c-results-banner c-results-banner--center"><article class="c-card">Banner</article>'
+               f'</section><nav class="c-pagination">{next_link}</nav>')
+    return layout(content, 'Hulpaanbod')
+
+
+def render_message_form(token: str, loaded: str) -> str:
+    return (f'<form name="message" method="post"><textarea name="message[body]"></textarea>'
+            f'<input type="text" name="message[phoneNumber]"><input type="text" name="message[dusdat]">'
+            f'<input type="hidden" name="message[_token]" value="{token}">'
+            f'<input type="hidden" name="message[loaded]" value="{loaded}"></form>')
+
+
+def render_offer_page(offer_id: str, profile_id: str, token: str, loaded: str) -> str:
+    content = (f'<div class="site-retain"><h1>Hulpaanbod {offer_id}</h1><p>{_filler(4)}</p>'
+               f'<div class="block block--small block--square text--center first"><div class="meta">'
+               f'<a href="/profiel/{profile_id}">Bekijk profiel</a></div></div>'
+               f'{render_message_form(token, loaded)}</div>')
+    return layout(content, f'Hulpaanbod {offer_id}')
+
+
+def render_inbox_page(conversations: List[Tuple[str, str, str]], page: int, page_count: int) -> str:
+    """
+    :param conversations: Tuples of chat id, volunteer name and offer id.
+    """
+    items = ''.join(
+        f'<li class="list__item list__item--messages"><div class="list__content">'
+        f'<a aria-labelledby="message-of-label" href="/mijn-pagina/berichten/{chat_id}">{escape(name)}</a>'
+        f'<a aria-labelledby="ad-label" href="/hulpaanbod/{offer_id}">Hulpaanbod {offer_id}</a>'
+        f'<p class="meta">Laatste bericht</p></div>'
+        f'<a class="button button--primary button--detail" href="/mijn-pagina/berichten/{chat_id}">Bekijk</a></li>'
+        for chat_id, name, offer_id in conversations)
+    paginator = ''
+    if page_count > 1:
+        links = ''.join(f'<a href="/mijn-pagina/berichten?p={number}">{number}</a>'
+                        for number in range(1, page_count + 1))
+        next_link = '<a href="/mijn-pagina/berichten?p=next">Volgende</a>' if page < page_count else ''
+        paginator = f'<div class="paginator">{links}{next_link}</div>'
+    return layout(f'<div class="site-retain"><ul class="list">{items}</ul>{paginator}</div>', 'Berichten')
+
+
+def render_conversation_page(receiver_name: str, offer_id: str, messages: List[Tuple[str, str]],
+                             token: str, loaded: str) -> str:
+    """
+    :param messages: Tuples of author first name and a date formatted as 'dd.mm.yyyy HH:MM'.
+    """
+    metas = ''.join(
+        f'<div class="conversation__message"><p class="conversation__body">Hallo, dit is een bericht.</p>'
+        f'<p class="meta conversation__meta">{escape(author)} {sent_at}</p></div>'
+        for author, sent_at in messages)
+    content = (f'<div class="site-retain react-dashboard-menu"><div><div class="col-span-3">{_filler(2)}</div>'
+               f'<div class="col-span-9">'
+               f'<dl class="list__definition list__definition--horizontal list__definition--plain '
+               f'list-definition--small">\n<dt>Naam</dt>\n<dd>{escape(receiver_name)}</dd>\n<dt>Hulpaanbod</dt>\n'
+               f'<dd><a href="/hulpaanbod/{offer_id}">Hulpaanbod {offer_id}</a></dd>\n</dl>'
+               f'<div class="conversation">{metas}</div>{render_message_form(token, loaded)}</div></div></div>')
+    return layout(content, 'Gesprek')
+
+
+def render_login_page(csrf_token: str) -> str:
+    content = (f'<form method="post" action="/login_check"><input type="hidden" name="_csrf_token" '
+               f'value="{csrf_token}"><input type="text" name="_username"><input type="password" name="_password">'
+               f'<input type="checkbox" name="_remember_me"></form>')
+    return layout(content, 'Inloggen')
+
+
+def render_profile_page(first_name: str, last_name: Optional[str] = None) -> str:
+    content = (f'<form><input type="text" id="user_profile_firstName" value="{escape(first_name)}">'
+               f'<input type="text" id="user_profile_lastName" value="{escape(last_name or "")}"></form>')
+    return layout(content, 'Profiel')
@@ -13,6 +13,57 @@ url_logout = f'{url_base}uitloggen'
 url_login_page = 'https://www.nlvoorelkaar.nl/inloggen'
 url_login = 'https://www.nlvoorelkaar.nl/login_check'
 
-delay_to_start_sending = 30.7584
-minimum_time = 30
-maximum_time = 60
+volunteers_per_page = 23
+# The pages of a search fetched ahead at the same time. The page loads stay paced by rate_limit_per_hour['page_load'],
+# so more workers than rate_limit_burst['page_load'] only wait for tokens
+crawl_max_workers = 4
+
+result_cache_path = 'result_cache.sqlite3'
+result_cache_ttl = 6 * 60 * 60
+result_cache_max_entries = 500
+
+autocomplete_debounce = 0.3
+autocomplete_cache_size = 200
+autocomplete_result_limit = 10
+
+scheduler_lane_workers = {'interactive': 4, 'bulk': 2, 'rate_limited': 1}
+
+http_pool_size = 10
+http_keep_alive = True
+http_keep_alive_expiry = 30
+http2_enabled = False
+http_max_concurrency = 8
+
+http_transport_mode = None  # "record" or "replay"
+http_archive_path = 'http_archive.jsonl'
+http_replay_latency = 0.0
+
+upload_retry_delay = 5
+upload_flush_timeout = 30
+
+blacklist_refresh_interval = 5 * 60
+
+storage_path = 'nlvoorelkaar.sqlite3'
+storage_push_delay = 2
+storage_pull_timeout = 30
+storage_poll_interval = 60
+
+reminder_compact_interval = 60
+reminder_compact_events = 100
+
+send_prefetch_depth = 2
+send_form_max_age = 5 * 60
+send_verify_batch = 10
+send_verify_pages = 3
+send_verify_attempts = 2
+send_verify_delay = 5
+
+# The pacing of the requests to the site, per account: the rate and the burst of the token bucket of every action,
+# and the maximum random extra wait in seconds
+rate_limit_per_hour = {'message': 120, 'reminder': 80, 'page_load': 2 * 3600}
+rate_limit_burst = {'message': 1, 'reminder': 1, 'page_load': 4}
+rate_limit_jitter = {'message': 30, 'reminder': 30, 'page_load': 0.5}
+
+profile_cache_path = 'profile_cache.sqlite3'
+profile_cache_memory_size = 5000
+profile_cache_negative_ttl = 10 * 60
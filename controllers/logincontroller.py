@@ -1,17 +1,16 @@
-import time
-
 from config.settings import url_login_page, headers, url_login, url_logout
 from controllers.logincontrollerinterface import LoginControllerInterface
 from models.sessionmanager import SessionManager
-from bs4 import BeautifulSoup
+from services.ratelimiter import RateLimiter
+from utils.html_parser import parse_html, LOGIN_FORM
 
 
 class LoginController(LoginControllerInterface):
 
     def login(self, username: str, password: str) -> bool:
+        RateLimiter().use_account(username)
         response = SessionManager.get_session().get(url_login_page, headers=headers)
-        time.sleep(2)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, LOGIN_FORM)
         csrf_token = soup.find('input', {'name': '_csrf_token'})['value']
         data = {
             '_csrf_token': csrf_token,
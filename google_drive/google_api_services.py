@@ -1,17 +1,24 @@
-import csv
 import io
+import logging
 import os
+import threading
 import time
+from collections import Counter
 
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
+from googleapiclient.http import HttpRequest, MediaIoBaseUpload, MediaIoBaseDownload
+
 SCOPES = ["https://www.googleapis.com/auth/drive"]
 mode = "production"  # "development"
 PATH = "./"
+FOLDER_NAME = "nlvoorelkaar_data"
+FILE_NAMES = ["contacts_date.csv", "reminder_data.csv", "chats_no_response.csv", "blacklisted_volunteers.csv"]
 
 
 class GoogleDriveManager:
@@ -19,11 +26,11 @@ class GoogleDriveManager:
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
-            cls._instance = super(GoogleDriveManager, cls).__new__(cls, *args, **kwargs)
+            cls._instance = super(GoogleDriveManager, cls).__new__(cls)
             cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, service=None):
         if self._initialized:
             return
         self._initialized = True
@@ -31,10 +38,62 @@ class GoogleDriveManager:
         self.service = None
         self.file_id = None
         self.folder_id = None
-        self.setup()
-
-    def setup(self):
-        if os.path.exists(f"{PATH}/token.json"):
+        self.cache_lock = threading.Lock()
+        self.file_ids = {}
+        self.contents = {}
+        self.cache_stats = Counter()
+        self.file_locks = {}
+        self.changes_lock = threading.Lock()
+        self.page_token = None
+        self.change_listeners = []
+        self.startup_timings = {}
+        # The Http every thread sends its requests through, see __build_request
+        self.http_local = threading.local()
+        self.ready = threading.Event()
+        # The setup runs in the background so the services can be built while the window opens, the methods
+        # that need Drive wait for it
+        threading.Thread(target=self.__setup_in_background, args=(service,), name="drive-setup", daemon=True).start()
+
+    def __setup_in_background(self, service):
+        try:
+            self.setup(service)
+        finally:
+            self.ready.set()
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for the setup started by the constructor.
+
+        :param timeout: The maximum amount of seconds to wait, None to wait until the setup is done.
+
+        :return: True once the setup is done, False if the timeout expired first.
+        """
+        return self.ready.wait(timeout)
+
+    def get_startup_timings(self):
+        """
+        :return: The seconds each step of the setup took, by step.
+        """
+        return dict(self.startup_timings)
+
+    def __time_step(self, step, started):
+        """
+        This private method is used to record how long a step of the setup took, and returns the time it ended.
+        """
+        ended = time.perf_counter()
+        self.startup_timings[step] = ended - started
+        return ended
+
+    def setup(self, service=None):
+        """
+        Authorise and make sure the data folder and its files exist. The files of the folder are found with a single
+        list request, only the missing ones are created.
+
+        :param service: A Drive service to use instead of building one from the stored credentials, e.g. a fake
+                        one for offline runs.
+        """
+        started = setup_started = time.perf_counter()
+        if service is None and os.path.exists(f"{PATH}/token.json"):
             if Credentials.from_authorized_user_file(f"{PATH}/token.json", SCOPES) is not None:
                 self.creds = Credentials.from_authorized_user_file(f"{PATH}/token.json", SCOPES)
                 if self.creds and self.creds.expired and self.creds.refresh_token:
@@ -50,41 +109,94 @@ class GoogleDriveManager:
 
                 with open(f"{PATH}/token.json", "w") as token:
                     token.write(self.creds.to_json())
+        started = self.__time_step("credentials", started)
 
         try:
-            service = build("drive", "v3", cache_discovery=False, credentials=self.creds)
+            if service is None:
+                service = build("drive", "v3", cache_discovery=False, credentials=self.creds,
+                                requestBuilder=self.__build_request)
             self.service = service
+            started = self.__time_step("service", started)
 
-            folder_name = "nlvoorelkaar_data"
-
-            self.folder_id = self.get_folder_id_by_name(folder_name)
+            self.folder_id = self.get_folder_id_by_name(FOLDER_NAME)
 
+            existing_files = {}
             if not self.folder_id:
                 file_metadata = {
-                    'name': folder_name,
+                    'name': FOLDER_NAME,
                     'mimeType': 'application/vnd.google-apps.folder'
                 }
                 folder = self.service.files().create(body=file_metadata, fields='id').execute()
                 folder_id = folder.get('id')
 
                 self.folder_id = folder_id
+            else:
+                existing_files = self.__list_folder()
+            started = self.__time_step("folder", started)
+
+            with self.cache_lock:
+                for file_name, file_id in existing_files.items():
+                    self.file_ids.setdefault(file_name, file_id)
 
-            files = ["contacts_date.csv", "reminder_data.csv", "chats_no_response.csv", "blacklisted_volunteers.csv"]
-            for file in files:
+            for file in FILE_NAMES:
+                if file in existing_files:
+                    continue
                 try:
-                    existing_file = self.find_file_by_name(file)
-                    if existing_file:
-                        pass
-                    else:
-                        file_metadata = {"name": file, "parents": [self.folder_id]}
-                        self.service.files().create(body=file_metadata, fields="id").execute()
-                        time.sleep(1)
+                    file_metadata = {"name": file, "parents": [self.folder_id]}
+                    created = self.service.files().create(body=file_metadata, fields="id").execute()
+                    with self.cache_lock:
+                        self.file_ids[file] = created.get("id")
                 except HttpError as error:
                     print("An error occurred: %s" % error)
+            self.__time_step("files", started)
 
         except Exception as e:
             print("An error occurred: %s" % e)
 
+        self.__time_step("total", setup_started)
+        self.__report_startup()
+
+    def __build_request(self, http, *args, **kwargs):
+        """
+        This private method is used to send every request of the service through an Http of the calling thread. An
+        Http of httplib2 is not thread-safe, and the service is used by the setup, the upload worker, the changes
+        poller and the callers at the same time.
+        """
+        thread_http = getattr(self.http_local, "http", None)
+        if thread_http is None:
+            thread_http = AuthorizedHttp(self.creds, http=httplib2.Http())
+            self.http_local.http = thread_http
+        return HttpRequest(thread_http, *args, **kwargs)
+
+    def __list_folder(self):
+        """
+        This private method is used to get the ids of all the files in the data folder at once.
+
+        :return: The ids of the files, by name. Of files with the same name the first one listed is kept.
+        """
+        files = {}
+        page_token = None
+        while True:
+            results = self.service.files().list(q=f"'{self.folder_id}' in parents and trashed=false",
+                                                spaces='drive',
+                                                fields="nextPageToken, files(id, name)",
+                                                pageToken=page_token).execute()
+            for item in results.get('files', []):
+                files.setdefault(item.get('name'), item.get('id'))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def __report_startup(self):
+        """
+        This private method is used to log where the time of the setup went.
+        """
+        steps = ", ".join(f"{step} {seconds:.2f} s" for step, seconds in self.startup_timings.items()
+                          if step != "total")
+        report = f"Google Drive ready in {self.startup_timings['total']:.2f} s ({steps})"
+        logging.info(report)
+        print(report)
+
     def get_new_credentials(self):
 
         flow = InstalledAppFlow.from_client_secrets_file(f"{PATH}/credentials.json", SCOPES)
@@ -100,23 +212,29 @@ class GoogleDriveManager:
         return None
 
     def find_file_by_name(self, file_name):
-        if not self.folder_id:
-            print(f"Folder ID is not set for {file_name}.")
+        file_id = self.find_file_id_by_name(file_name)
+        if not file_id:
             return None
-        query = f"name='{file_name}' and '{self.folder_id}' in parents"
-        results = self.service.files().list(q=query,
-                                                spaces='drive',
-                                                fields="files(id, name)").execute()
-        items = results.get('files', [])
-        if not items:
-            return None
-        else:
-            return items[0]
+        return {"id": file_id, "name": file_name}
 
     def find_file_id_by_name(self, file_name):
+        """
+        Get the id of a file in the data folder. The ids are kept for the lifetime of the process, only the first
+        lookup of a file queries Drive.
+
+        :param file_name: The name of the file.
+
+        :return: The id of the file, or None if the folder holds no such file.
+        """
+        self.wait_until_ready()
         if not self.folder_id:
             print(f"Folder ID is not set for {file_name}.")
             return None
+        with self.cache_lock:
+            file_id = self.file_ids.get(file_name)
+            self.cache_stats["id_hits" if file_id else "id_misses"] += 1
+        if file_id:
+            return file_id
         query = f"name='{file_name}' and '{self.folder_id}' in parents"
         results = self.service.files().list(q=query,
                                             spaces='drive',
@@ -125,9 +243,134 @@ class GoogleDriveManager:
         if not items:
             return None
         else:
-            return items[0].get("id")
+            file_id = items[0].get("id")
+            with self.cache_lock:
+                self.file_ids[file_name] = file_id
+            return file_id
+
+    def forget_file(self, file_name):
+        """
+        Drop the cached id and content of a file, e.g. after it was deleted or replaced outside of this process.
+        """
+        with self.cache_lock:
+            file_id = self.file_ids.pop(file_name, None)
+            self.contents.pop(file_id, None)
+
+    def get_cache_stats(self) -> dict:
+        """
+        :return: The hits and misses of the file id and content caches, and the writes refused because the file
+                 had changed.
+        """
+        with self.cache_lock:
+            return {key: self.cache_stats[key] for key in ("id_hits", "id_misses", "content_hits", "content_misses",
+                                                           "write_conflicts")}
+
+    def __get_revision(self, file_id):
+        """
+        This private method is used to get a cheap fingerprint of the current content of a file.
+
+        :return: The md5 checksum of the content, or the head revision id for files without one.
+        """
+        metadata = self.service.files().get(fileId=file_id, fields="md5Checksum, headRevisionId").execute()
+        return metadata.get("md5Checksum") or metadata.get("headRevisionId")
+
+    def __store_content(self, file_id, revision, content):
+        """
+        This private method is used to cache the content of a file under the revision Drive reported for it.
+        """
+        with self.cache_lock:
+            if revision:
+                self.contents[file_id] = (revision, content)
+            else:
+                self.contents.pop(file_id, None)
+
+    def __download(self, file_id, revision):
+        """
+        This private method is used to download the content of a file and cache it under its revision.
+        """
+        request = self.service.files().get_media(fileId=file_id)
+        fh = io.BytesIO()
+        downloader = MediaIoBaseDownload(fh, request)
+        done = False
+        while done is False:
+            status, done = downloader.next_chunk()
+        content = fh.getvalue()
+        self.__store_content(file_id, revision, content)
+        return content
+
+    def subscribe_changes(self, listener):
+        """
+        :param listener: Called as listener(file_name, file_content) for every file of the data folder that
+                         get_changes finds changed.
+        """
+        with self.changes_lock:
+            self.change_listeners.append(listener)
+
+    def start_changes(self):
+        """
+        Start following the changes feed of Drive. The next get_changes reports the changes made after this call.
+        """
+        self.wait_until_ready()
+        response = self.service.changes().getStartPageToken().execute()
+        with self.changes_lock:
+            self.page_token = response.get("startPageToken")
+
+    def get_changes(self):
+        """
+        Ask Drive which files of the data folder changed since the last call, instead of checking every file. Only
+        the files whose content differs from the cached one are downloaded, and passed to the subscribers. Changes
+        made by the uploads of this process are recognised by their revision and skipped.
+
+        :return: The names of the files that changed.
+        """
+        self.wait_until_ready()
+        if self.page_token is None:
+            self.start_changes()
+            return []
+
+        with self.changes_lock:
+            changed_files = {}
+            page_token = self.page_token
+            while page_token:
+                response = self.service.changes().list(
+                    pageToken=page_token, spaces="drive", includeRemoved=True,
+                    fields="nextPageToken, newStartPageToken, "
+                           "changes(fileId, removed, file(name, parents, trashed, md5Checksum, headRevisionId))"
+                ).execute()
+                for change in response.get("changes", []):
+                    file_id = change.get("fileId")
+                    file = change.get("file") or {}
+                    if change.get("removed") or file.get("trashed"):
+                        changed_files.pop(file_id, None)
+                        with self.cache_lock:
+                            self.file_ids = {name: known_id for name, known_id in self.file_ids.items()
+                                             if known_id != file_id}
+                            self.contents.pop(file_id, None)
+                    elif self.folder_id in file.get("parents", []):
+                        changed_files[file_id] = file
+                page_token = response.get("nextPageToken")
+                self.page_token = response.get("newStartPageToken", self.page_token)
+
+            changes = []
+            for file_id, file in changed_files.items():
+                revision = file.get("md5Checksum") or file.get("headRevisionId")
+                with self.cache_lock:
+                    self.file_ids.setdefault(file["name"], file_id)
+                    cached = self.contents.get(file_id)
+                if cached and revision and revision == cached[0]:
+                    continue
+                changes.append((file["name"], self.__download(file_id, revision)))
+
+        for file_name, content in changes:
+            for listener in list(self.change_listeners):
+                try:
+                    listener(file_name, content)
+                except Exception as e:
+                    logging.error(f"Error while notifying a change of {file_name}: {e}")
+        return [file_name for file_name, _ in changes]
 
     def upload_file(self, local_file_path, drive_file_name):
+        self.wait_until_ready()
         file_metadata = {
             "name": drive_file_name,
             "parents": [self.folder_id]  # Specify the folder ID here
@@ -141,36 +384,103 @@ class GoogleDriveManager:
         else:
             file = self.service.files().create(body=file_metadata, media_body=media, fields="id").execute()
             self.file_id = file.get("id")
+            with self.cache_lock:
+                self.file_ids[drive_file_name] = self.file_id
+        with self.cache_lock:
+            self.contents.pop(self.file_id, None)
 
         return self.file_id
 
     def upload_file_content(self, file_content, drive_file_name):
+        self.wait_until_ready()
         media_body = MediaIoBaseUpload(io.BytesIO(file_content), mimetype='text/csv', resumable=True)
         file_metadata = {
             "name": drive_file_name,
         }
 
-        existing_file = self.find_file_by_name(drive_file_name)
-        if existing_file:
-            self.file_id = existing_file.get("id")
-            response = self.service.files().update(fileId=self.file_id, media_body=media_body,
-                                                   body=file_metadata).execute()
-        else:
-            response = self.service.files().create(body=file_metadata, media_body=media_body, fields="id").execute()
-            self.file_id = response.get("id")
-
+        with self.get_file_lock(drive_file_name):
+            existing_file = self.find_file_by_name(drive_file_name)
+            if existing_file:
+                file_id = existing_file.get("id")
+                response = self.service.files().update(fileId=file_id, media_body=media_body, body=file_metadata,
+                                                       fields="id, md5Checksum, headRevisionId").execute()
+            else:
+                response = self.service.files().create(body=file_metadata, media_body=media_body,
+                                                       fields="id, md5Checksum, headRevisionId").execute()
+                file_id = response.get("id")
+                with self.cache_lock:
+                    self.file_ids[drive_file_name] = file_id
+            self.file_id = file_id
+
+            # What was just uploaded is the current content, the next read only has to confirm the revision
+            self.__store_content(file_id, response.get("md5Checksum") or response.get("headRevisionId"),
+                                 file_content)
         return response
 
+    def upload_file_content_if_unchanged(self, file_content, drive_file_name, revision):
+        """
+        Upload the content of a file only if the file on Drive still has the revision the content is based on, so
+        changes made by others since are not overwritten. The check and the upload hold the lock of the file, other
+        writes of this process cannot come in between.
+
+        :param revision: The revision the content is based on, as returned by get_known_revision, or None for a
+                         file that does not exist yet.
+
+        :return: The response of the upload, or None if the file changed and has to be read again.
+        """
+        self.wait_until_ready()
+        with self.get_file_lock(drive_file_name):
+            file_id = self.find_file_id_by_name(drive_file_name)
+            if file_id and (revision is None or self.__get_revision(file_id) != revision):
+                with self.cache_lock:
+                    self.cache_stats["write_conflicts"] += 1
+                return None
+            return self.upload_file_content(file_content, drive_file_name)
+
+    def get_file_lock(self, file_name):
+        """
+        :return: The lock that serialises the writes of this process to a file.
+        """
+        with self.cache_lock:
+            return self.file_locks.setdefault(file_name, threading.RLock())
+
+    def get_known_revision(self, file_name):
+        """
+        :return: The revision of a file as this process last downloaded or uploaded it, or None if it did not.
+        """
+        with self.cache_lock:
+            cached = self.contents.get(self.file_ids.get(file_name))
+        return cached[0] if cached else None
+
     def download_file_content(self, file_id):
-        request = self.service.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-        return fh.getvalue()
+        """
+        Get the content of a file. The content is cached with its revision, a file that did not change since it
+        was last read costs a metadata request instead of a download.
+
+        :param file_id: The id of the file.
+
+        :return: The content of the file.
+        """
+        self.wait_until_ready()
+        try:
+            revision = self.__get_revision(file_id)
+        except HttpError as error:
+            if error.resp.status == 404:
+                with self.cache_lock:
+                    self.file_ids = {name: known_id for name, known_id in self.file_ids.items() if known_id != file_id}
+                    self.contents.pop(file_id, None)
+            raise
+        with self.cache_lock:
+            cached = self.contents.get(file_id)
+            if cached and revision and revision == cached[0]:
+                self.cache_stats["content_hits"] += 1
+                return cached[1]
+            self.cache_stats["content_misses"] += 1
+
+        return self.__download(file_id, revision)
 
     def download_file(self, file_id, local_file_path):
+        self.wait_until_ready()
         request = self.service.files().get_media(fileId=file_id)
         fh = io.FileIO(local_file_path, "wb")
         downloader = MediaIoBaseDownload(fh, request)
@@ -178,32 +488,3 @@ class GoogleDriveManager:
         while not done:
             status, done = downloader.next_chunk()
         fh.close()
-
-    def write_frequency_data(self, reminder_frequency, reminder_message):
-        file_name = "reminder_data.csv"
-        existing_file = self.find_file_by_name(file_name)
-        file_id = existing_file.get("id") if existing_file else None
-
-        with io.StringIO() as file_content:
-            writer = csv.writer(file_content)
-            writer.writerow([reminder_frequency, reminder_message])
-            file_content.seek(0)
-
-            if file_id:
-                self.upload_file_content(file_content.getvalue().encode('utf-8'), file_name)
-            else:
-                self.upload_file_content(file_content.getvalue().encode('utf-8'), file_name)
-
-    def read_frequency_data(self):
-        file_name = "reminder_data.csv"
-        existing_file = self.find_file_by_name(file_name)
-        file_id = existing_file.get("id") if existing_file else None
-
-        if file_id:
-            file_content = self.download_file_content(file_id)
-            with io.StringIO(file_content.decode('utf-8')) as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    return row[0], row[1]
-
-        return None, None
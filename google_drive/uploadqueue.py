@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class UploadQueue:
+    """
+    Write-behind queue for the files of the data folder.
+
+    Writes are uploaded on a background thread. A file written again before its upload started is uploaded once,
+    with the latest content, and waiting coalesce_delay seconds after a write lets a burst of writes collapse.
+    Failed uploads are retried after retry_delay seconds unless a newer write replaced them.
+
+    The queue does not look into the content, upload gets what was enqueued last. A DriveSync, for instance,
+    enqueues the name of a table and only builds the file once the upload starts.
+
+    :param upload: Uploads the content of a file, called as upload(file_content, file_name).
+    """
+
+    def __init__(self, upload: Callable[[Any, str], object], coalesce_delay: float, retry_delay: float):
+        self.upload = upload
+        self.coalesce_delay = coalesce_delay
+        self.retry_delay = retry_delay
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.due = {}
+        self.uploading = None
+        self.stats = {'enqueued': 0, 'uploaded': 0, 'coalesced': 0, 'failed': 0}
+        self.stopped = False
+        self.worker = None
+
+    def enqueue(self, file_content: Any, file_name: str) -> None:
+        """
+        Schedule the upload of the content of a file, replacing a pending upload of the same file.
+        """
+        with self.condition:
+            self.stats['enqueued'] += 1
+            if file_name in self.pending:
+                self.stats['coalesced'] += 1
+            else:
+                self.due[file_name] = time.monotonic() + self.coalesce_delay
+            self.pending[file_name] = file_content
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.__run, name='drive-uploads', daemon=True)
+                self.worker.start()
+            self.condition.notify_all()
+
+    def get_pending(self, file_name: str) -> Optional[Any]:
+        """
+        :return: The content of the file still waiting to be uploaded or being uploaded, or None if there is none.
+        """
+        with self.condition:
+            if file_name in self.pending:
+                return self.pending[file_name]
+            if self.uploading and self.uploading[0] == file_name:
+                return self.uploading[1]
+            return None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Upload the pending writes now, blocking until they are done.
+
+        :param timeout: The maximum amount of seconds to wait, None to wait until all the uploads are done.
+
+        :return: True if nothing is left to upload, False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            now = time.monotonic()
+            for file_name in self.due:
+                self.due[file_name] = now
+            self.condition.notify_all()
+            while self.pending or self.uploading:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Upload the pending writes and stop the background thread.
+        """
+        flushed = self.flush(timeout)
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        return flushed
+
+    def __next_upload(self) -> Optional[tuple]:
+        """
+        This private method is used to wait for the next file due for upload, called with the condition held.
+
+        :return: The name and content of the file, or None once the queue is stopped.
+        """
+        while not self.stopped:
+            if self.due:
+                file_name = min(self.due, key=self.due.get)
+                wait_time = self.due[file_name] - time.monotonic()
+                if wait_time <= 0:
+                    del self.due[file_name]
+                    return file_name, self.pending.pop(file_name)
+                self.condition.wait(wait_time)
+            else:
+                self.condition.wait()
+        return None
+
+    def __run(self) -> None:
+        while True:
+            with self.condition:
+                upload = self.__next_upload()
+                if upload is None:
+                    return
+                self.uploading = upload
+            file_name, file_content = upload
+            try:
+                self.upload(file_content, file_name)
+                uploaded = True
+            except Exception as e:
+                uploaded = False
+                logging.error(f'Error while uploading {file_name}, retrying in {self.retry_delay} seconds: {e}')
+                print(f'Error while uploading {file_name}: {e}')
+            with self.condition:
+                self.uploading = None
+                if uploaded:
+                    self.stats['uploaded'] += 1
+                else:
+                    self.stats['failed'] += 1
+                    if file_name not in self.pending:
+                        self.pending[file_name] = file_content
+                        self.due[file_name] = time.monotonic() + self.retry_delay
+                self.condition.notify_all()
@@ -1,5 +1,5 @@
+import logging
 import os
-import threading  # Import threading module
 import time
 
 from services.servicemanager import ServiceManager
@@ -13,25 +13,29 @@ from view.windowsmanagerconfig import WindowsManagerConfig
 
 
 def reminder_start( service_manager: ServiceManager):
-    def run_service():
-        service_manager.start_reminder_service()
-    # Run the service manager in a separate thread
-    threading.Thread(target=run_service).start()
+    # The service manager runs the reminder service on the bulk lane of its task scheduler
+    service_manager.start_reminder_service()
 
 
-def on_close():
+def on_close(service_manager: ServiceManager):
+    # Pending writes are flushed first, os._exit does not give daemon threads a chance to finish
+    service_manager.shutdown()
     os._exit(0)
 
 
 if __name__ == '__main__':
+        started = time.perf_counter()
         LoggingManager().config()
         service_manager = ServiceManager()  # Create an instance of ServiceManager
         root_window = ctk.CTk()
 
         windows_manager = WindowManager(WindowsManagerConfig(root_window).get_config())
         windows_manager.go_to_window("LoginView")
+        startup_report = f'Login window ready in {time.perf_counter() - started:.2f} s'
+        logging.info(startup_report)
+        print(startup_report)
 
-        root_window.protocol("WM_DELETE_WINDOW", on_close)
+        root_window.protocol("WM_DELETE_WINDOW", lambda: on_close(service_manager))
 
         # Schedule reminder_start to run after a short delay (e.g., 100 milliseconds)
         root_window.after(100, reminder_start,  service_manager)
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import requests
+
+from services.ratelimiter import RateLimiter, PAGE_LOAD
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncHttpClient:
+    """
+    asyncio client sharing its cookies, and so the login, with the requests session of the SessionManager.
+
+    With httpx installed the requests are multiplexed over a few pooled connections, over HTTP/2 if enabled and
+    h2 is installed. Without httpx they run on a small thread pool through the requests session. Either way at
+    most max_concurrency requests are in flight at the same time.
+
+    The client runs its own event loop on a background thread. The coroutines can be awaited from any event loop,
+    and fetch_all offers the same to code that is not asynchronous.
+    """
+
+    def __init__(self, session: requests.Session, pool_size: int, keep_alive: bool, keep_alive_expiry: float,
+                 http2: bool, max_concurrency: int, use_httpx: bool = True):
+        self.session = session
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.keep_alive_expiry = keep_alive_expiry
+        self.http2 = http2
+        self.max_concurrency = max_concurrency
+        self.use_httpx = use_httpx and httpx is not None
+        self.client = None
+        self.executor = None
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name='async-http', daemon=True)
+        self.loop_thread.start()
+        self.semaphore = asyncio.run_coroutine_threadsafe(self.__create_semaphore(), self.loop).result()
+
+    async def __create_semaphore(self) -> asyncio.Semaphore:
+        return asyncio.Semaphore(self.max_concurrency)
+
+    def __get_client(self):
+        """
+        This private method is used to create the httpx client on first use, on the loop of this client.
+        """
+        if self.client is None:
+            limits = httpx.Limits(max_connections=self.pool_size,
+                                  max_keepalive_connections=self.pool_size if self.keep_alive else 0,
+                                  keepalive_expiry=self.keep_alive_expiry)
+            try:
+                self.client = httpx.AsyncClient(cookies=self.session.cookies, limits=limits, http2=self.http2,
+                                                follow_redirects=True)
+            except ImportError as e:
+                logging.error(f'HTTP/2 is not available, falling back to HTTP/1.1: {e}')
+                self.client = httpx.AsyncClient(cookies=self.session.cookies, limits=limits, follow_redirects=True)
+        return self.client
+
+    async def __request(self, method: str, url: str, **kwargs):
+        async with self.semaphore:
+            if self.use_httpx:
+                # The requests session takes its PAGE_LOAD token itself, httpx bypasses it
+                wait = RateLimiter().reserve(PAGE_LOAD)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                return await self.__get_client().request(method, url, **kwargs)
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='async-http')
+            return await self.loop.run_in_executor(self.executor,
+                                                   lambda: getattr(self.session, method.lower())(url, **kwargs))
+
+    async def __on_loop(self, coroutine):
+        """
+        This private method is used to run a coroutine on the loop of this client, whatever loop awaits it.
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    async def get(self, url: str, headers: Optional[dict] = None):
+        return await self.__on_loop(self.__request('GET', url, headers=headers))
+
+    async def post(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None):
+        return await self.__on_loop(self.__request('POST', url, data=data, headers=headers))
+
+    async def get_all(self, urls: List[str], headers: Optional[dict] = None) -> list:
+        """
+        Get several urls concurrently.
+
+        :return: The responses, in the order of the urls.
+        """
+        return await self.__on_loop(self.__gather(urls, headers))
+
+    async def __gather(self, urls: List[str], headers: Optional[dict]) -> list:
+        return list(await asyncio.gather(*(self.__request('GET', url, headers=headers) for url in urls)))
+
+    def fetch_all(self, urls: List[str], headers: Optional[dict] = None) -> list:
+        """
+        Get several urls concurrently, blocking until all the responses are in.
+
+        :return: The responses, in the order of the urls.
+        """
+        return asyncio.run_coroutine_threadsafe(self.get_all(urls, headers), self.loop).result()
+
+    def close(self) -> None:
+        if self.client is not None:
+            asyncio.run_coroutine_threadsafe(self.client.aclose(), self.loop).result()
+            self.client = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.loop.call_soon_threadsafe(self.loop.stop)
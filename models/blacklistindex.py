@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from config.settings import blacklist_refresh_interval
+from storage.storageinterface import StorageInterface
+from storage.storagemanager import StorageManager
+
+
+class BlacklistIndex:
+    """
+    The blacklisted profile ids, held in memory.
+
+    The index is loaded from the blacklist table of the local storage on first use, and reloaded whenever the
+    storage takes in a change from Drive. Once the index is older than refresh_interval seconds, the next lookup
+    answers from memory and starts a poll of the Drive changes feed in the background, which only downloads
+    blacklisted_volunteers.csv if another client changed it. Local changes apply to the index at once, the storage
+    pushes them to Drive.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(BlacklistIndex, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, storage: Optional[StorageInterface] = None,
+                 refresh_interval: float = blacklist_refresh_interval):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.storage = storage
+        self.refresh_interval = refresh_interval
+        self.lock = threading.RLock()
+        # A dict keeps the ids in the order of the file, for display
+        self.profile_ids = None
+        self.loaded_at = 0.0
+        self.refreshing = False
+
+    def __get_ids(self) -> dict:
+        """
+        This private method is used to get the index, loading it on first use and refreshing it once it is stale.
+        """
+        profile_ids = self.profile_ids
+        if profile_ids is not None and (self.refreshing or time.monotonic() - self.loaded_at <= self.refresh_interval):
+            return profile_ids
+        with self.lock:
+            if self.profile_ids is None:
+                if self.storage is None:
+                    self.storage = StorageManager.get_storage()
+                self.storage.subscribe(self.__on_change)
+                self.__load()
+            elif time.monotonic() - self.loaded_at > self.refresh_interval and not self.refreshing:
+                self.refreshing = True
+                threading.Thread(target=self.refresh, name='blacklist-refresh', daemon=True).start()
+            return self.profile_ids
+
+    def __load(self) -> None:
+        with self.lock:
+            self.profile_ids = {row[0]: None for row in self.storage.all('blacklist')}
+            self.loaded_at = time.monotonic()
+
+    def __on_change(self, table: str, remote: bool) -> None:
+        if table == 'blacklist' and remote:
+            self.__load()
+
+    def refresh(self) -> None:
+        """
+        Poll Drive for changes. If the blacklist changed, the index is reloaded once the storage took it in.
+        """
+        try:
+            StorageManager.get_sync().poll()
+        except Exception as e:
+            logging.error(f'Error while refreshing the blacklist: {e}')
+        finally:
+            with self.lock:
+                self.refreshing = False
+                self.loaded_at = time.monotonic()
+
+    def contains(self, profile_id: Optional[str]) -> bool:
+        """
+        :return: True if the profile id is blacklisted, False otherwise.
+        """
+        return profile_id is not None and profile_id in self.__get_ids()
+
+    def filter_blacklisted(self, profile_ids: Iterable[str]) -> List[str]:
+        """
+        :return: The profile ids that are not blacklisted, in the order given.
+        """
+        blacklisted = self.__get_ids()
+        return [profile_id for profile_id in profile_ids if profile_id not in blacklisted]
+
+    def get_all(self) -> List[str]:
+        """
+        :return: All the blacklisted profile ids, in the order they were added.
+        """
+        with self.lock:
+            return list(self.__get_ids())
+
+    def add(self, profile_ids: Iterable[str]) -> List[str]:
+        """
+        Blacklist profile ids.
+
+        :return: The profile ids that were not blacklisted yet.
+        """
+        with self.lock:
+            blacklisted = self.__get_ids()
+            added = []
+            for profile_id in profile_ids:
+                if profile_id not in blacklisted:
+                    blacklisted[profile_id] = None
+                    added.append(profile_id)
+            self.storage.put('blacklist', [[profile_id] for profile_id in added])
+            return added
+
+    def remove(self, profile_ids: Iterable[str]) -> List[str]:
+        """
+        Remove profile ids from the blacklist.
+
+        :return: The profile ids that were blacklisted.
+        """
+        with self.lock:
+            blacklisted = self.__get_ids()
+            removed = [profile_id for profile_id in dict.fromkeys(profile_ids) if profile_id in blacklisted]
+            for profile_id in removed:
+                del blacklisted[profile_id]
+            self.storage.delete('blacklist', removed)
+            return removed
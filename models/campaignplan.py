@@ -0,0 +1,31 @@
+from typing import Dict, List, Optional
+
+
+class CampaignPlan:
+    """
+    The recipients of a campaign that can be messaged, and the reason every other recipient is skipped.
+    """
+
+    def __init__(self, sendable: List[str], skipped: Dict[str, str]):
+        self.sendable = sendable
+        self.skipped = skipped
+        self.sendable_ids = set(sendable)
+
+    def is_sendable(self, volunteer_id: str) -> bool:
+        return volunteer_id in self.sendable_ids
+
+    def get_reason(self, volunteer_id: str) -> Optional[str]:
+        """
+        :return: The reason the volunteer is skipped, or None if they can be messaged.
+        """
+        return self.skipped.get(volunteer_id)
+
+    def extend(self, plan: 'CampaignPlan') -> None:
+        """
+        Add the recipients of another plan, e.g. the next batch of a campaign that is planned as it streams in.
+        """
+        for volunteer_id in plan.sendable:
+            if volunteer_id not in self.sendable_ids:
+                self.sendable.append(volunteer_id)
+                self.sendable_ids.add(volunteer_id)
+        self.skipped.update(plan.skipped)
@@ -0,0 +1,93 @@
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+from dateutil.relativedelta import relativedelta
+
+from storage.storageinterface import StorageInterface
+from storage.storagemanager import StorageManager
+
+
+class ContactsStore:
+    """
+    The last contact date of every volunteer, kept in the contacts table of the local storage, which is indexed by
+    volunteer id. The storage pushes the changes to contacts_date.csv on Drive in the background.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ContactsStore, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, storage: Optional[StorageInterface] = None):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.storage = storage
+        self.lock = threading.Lock()
+
+    def __get_storage(self) -> StorageInterface:
+        if self.storage is None:
+            self.storage = StorageManager.get_storage()
+        return self.storage
+
+    def get_last_contact(self, volunteer_id: str) -> Optional[date]:
+        """
+        :param volunteer_id: The id of the volunteer.
+
+        :return: The last date the volunteer was contacted, or None if they never were.
+        """
+        row = self.__get_storage().get('contacts', volunteer_id)
+        if not row or len(row) < 2:
+            return None
+        return datetime.strptime(row[1], '%Y-%m-%d').date()
+
+    def get_last_contacts(self, volunteer_ids: Iterable[str]) -> Dict[str, date]:
+        """
+        :param volunteer_ids: The ids of the volunteers.
+
+        :return: The last date each volunteer was contacted, by id, for the volunteers that were.
+        """
+        rows = self.__get_storage().get_many('contacts', volunteer_ids)
+        return {volunteer_id: datetime.strptime(row[1], '%Y-%m-%d').date()
+                for volunteer_id, row in rows.items() if len(row) > 1}
+
+    @staticmethod
+    def is_recent(last_contact_date: Optional[date]) -> bool:
+        """
+        :return: True if the date is in the last six months, False otherwise or if there is no date.
+        """
+        return last_contact_date is not None and last_contact_date > date.today() - relativedelta(months=6)
+
+    def was_contacted_recently(self, volunteer_id: str) -> bool:
+        """
+        :return: True if the volunteer was contacted in the last six months, False otherwise.
+        """
+        return self.is_recent(self.get_last_contact(volunteer_id))
+
+    def record_contact(self, volunteer_id: str) -> None:
+        """
+        Set the last contact date of the volunteer to today, unless they were contacted in the last six months.
+
+        :param volunteer_id: The id of the volunteer.
+        """
+        with self.lock:
+            if self.was_contacted_recently(volunteer_id):
+                return
+            self.__get_storage().put('contacts', [[volunteer_id, date.today().strftime('%Y-%m-%d')]])
+
+    def record_contacts(self, volunteer_ids: Iterable[str]) -> None:
+        """
+        Set the last contact date of several volunteers to today at once, skipping the ones contacted in the last
+        six months.
+
+        :param volunteer_ids: The ids of the volunteers.
+        """
+        volunteer_ids = list(dict.fromkeys(volunteer_ids))
+        with self.lock:
+            last_contacts = self.get_last_contacts(volunteer_ids)
+            today = date.today().strftime('%Y-%m-%d')
+            self.__get_storage().put('contacts', [[volunteer_id, today] for volunteer_id in volunteer_ids
+                                                  if not self.is_recent(last_contacts.get(volunteer_id))])
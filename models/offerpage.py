@@ -0,0 +1,51 @@
+from typing import Optional
+
+from config.settings import headers, url_volunteer
+from models.profileidcache import ProfileIdCache, PROFILE_ID
+from models.sessionmanager import SessionManager
+from utils.html_parser import parse_html, OFFER_PAGE
+from utils.profile_id_extractor import parse_profile_id
+
+
+class OfferPage:
+    """
+    The parts of an offer page the messaging reads, the profile id of the volunteer and the hidden fields of the
+    message form, parsed from a single load of the page.
+    """
+
+    def __init__(self, volunteer_id: str, profile_id: Optional[str], form: Optional[dict]):
+        self.volunteer_id = volunteer_id
+        self.profile_id = profile_id
+        self.form = form
+
+    @staticmethod
+    def get_url(volunteer_id: str) -> str:
+        return f'{url_volunteer}{volunteer_id}?showMessage=1'
+
+    @staticmethod
+    def parse(volunteer_id: str, markup) -> 'OfferPage':
+        """
+        :param volunteer_id: The id of the volunteer the offer belongs to.
+        :param markup: The offer page as text or bytes.
+        """
+        soup = parse_html(markup, OFFER_PAGE)
+        token = soup.find('input', {'name': 'message[_token]'})
+        loaded = soup.find('input', {'name': 'message[loaded]'})
+        form = {'message[_token]': token['value'], 'message[loaded]': loaded['value']} if token and loaded else None
+        return OfferPage(volunteer_id, parse_profile_id(soup), form)
+
+    @staticmethod
+    def load(volunteer_id: str) -> Optional['OfferPage']:
+        """
+        Load and parse the offer page of a volunteer. The profile id found is stored in the ProfileIdCache.
+
+        :return: The offer page, or None if it could not be loaded.
+        """
+        response = SessionManager.get_session().get(OfferPage.get_url(volunteer_id), headers=headers)
+        if response.status_code != 200:
+            print(f"Failed to retrieve the webpage. Status code: {response.status_code}")
+            return None
+        offer_page = OfferPage.parse(volunteer_id, response.content)
+        if offer_page.profile_id:
+            ProfileIdCache().set(PROFILE_ID, volunteer_id, offer_page.profile_id)
+        return offer_page
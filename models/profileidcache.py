@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+from config.settings import profile_cache_path, profile_cache_memory_size, profile_cache_negative_ttl
+
+# The kinds of mapping kept in the cache
+PROFILE_ID = 'profile_id'  # offer id -> profile id
+OFFER_URL = 'offer_url'  # chat url -> offer url
+
+
+class ProfileIdCache:
+    """
+    Persistent cache of the mappings that take a page load to resolve but practically never change: the profile id
+    of an offer and the offer url of a chat.
+
+    The mappings are stored in a local SQLite file so they survive restarts, with the most recently used ones held
+    in memory. A mapping that could not be resolved is cached as well, for negative_ttl seconds only.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ProfileIdCache, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, path: str = profile_cache_path, memory_size: int = profile_cache_memory_size,
+                 negative_ttl: float = profile_cache_negative_ttl):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.memory_size = memory_size
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        # (kind, key) -> (value, stored_at), the least recently used first
+        self.memory = OrderedDict()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS mappings ('
+                                    'kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT, stored_at REAL NOT NULL, '
+                                    'PRIMARY KEY (kind, key))')
+
+    def __is_valid(self, value: Optional[str], stored_at: float) -> bool:
+        return value is not None or time.time() - stored_at <= self.negative_ttl
+
+    def __remember(self, kind: str, key: str, value: Optional[str], stored_at: float) -> None:
+        """
+        This private method is used to put a mapping in memory, evicting the least recently used ones. Called with
+        the lock held.
+        """
+        self.memory[(kind, key)] = (value, stored_at)
+        self.memory.move_to_end((kind, key))
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def __lookup(self, kind: str, key: str):
+        """
+        This private method is used to find a mapping in memory, then on disk.
+
+        :return: The (value, stored_at) of the mapping, or None if it is not cached or has expired.
+        """
+        with self.lock:
+            entry = self.memory.get((kind, key))
+            if entry is None:
+                entry = self.connection.execute('SELECT value, stored_at FROM mappings WHERE kind = ? AND key = ?',
+                                                (kind, key)).fetchone()
+            if entry is None or not self.__is_valid(*entry):
+                self.memory.pop((kind, key), None)
+                return None
+            self.__remember(kind, key, *entry)
+            return entry
+
+    def get(self, kind: str, key: str, resolve: Callable[[str], Optional[str]]) -> Optional[str]:
+        """
+        Get a mapping, resolving and storing it if it is not cached.
+
+        :param kind: PROFILE_ID or OFFER_URL.
+        :param key: The offer id or the chat url.
+        :param resolve: Called with the key to load the value from the site, returns None if it cannot.
+
+        :return: The value, or None if it could not be resolved.
+        """
+        entry = self.__lookup(kind, key)
+        if entry is not None:
+            return entry[0]
+        value = resolve(key)
+        self.set(kind, key, value)
+        return value
+
+    def set(self, kind: str, key: str, value: Optional[str]) -> None:
+        """
+        Store a mapping. None stores that the mapping could not be resolved.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO mappings (kind, key, value, stored_at) '
+                                    'VALUES (?, ?, ?, ?)', (kind, key, value, now))
+            self.__remember(kind, key, value, now)
+
+    def get_cached(self, kind: str, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Get the mappings that are cached for some keys, without resolving the others. Reading many keys at once
+        loads them into memory with one query, e.g. before a campaign or a reminder run.
+
+        :return: The values found, by key. Keys that are not cached or could not be resolved are left out.
+        """
+        keys = list(dict.fromkeys(keys))
+        values = {}
+        with self.lock:
+            missing = [key for key in keys if (kind, key) not in self.memory]
+            # SQLite limits the amount of parameters of a statement
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                for key, value, stored_at in self.connection.execute(
+                        f'SELECT key, value, stored_at FROM mappings WHERE kind = ? AND key IN ({placeholders})',
+                        [kind] + chunk):
+                    if self.__is_valid(value, stored_at):
+                        self.__remember(kind, key, value, stored_at)
+            for key in keys:
+                entry = self.memory.get((kind, key))
+                if entry is not None and entry[0] is not None:
+                    values[key] = entry[0]
+        return values
@@ -0,0 +1,124 @@
+import base64
+import io
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+class HttpArchive:
+    """
+    Request/response pairs stored as JSON lines, one exchange per line, so a recording survives a crash.
+
+    Exchanges are looked up by method and url. Repeated requests get the recorded responses in the order they were
+    recorded, the last one is served again once they run out.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.exchanges = defaultdict(list)
+        self.served = defaultdict(int)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    if line.strip():
+                        exchange = json.loads(line)
+                        self.exchanges[(exchange['method'], exchange['url'])].append(exchange)
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response) -> None:
+        exchange = {
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+            'content': base64.b64encode(response.content).decode('ascii'),
+        }
+        with self.lock:
+            self.exchanges[(request.method, request.url)].append(exchange)
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(exchange) + '\n')
+
+    def next_exchange(self, request: requests.PreparedRequest) -> Optional[dict]:
+        key = (request.method, request.url)
+        with self.lock:
+            exchanges = self.exchanges.get(key)
+            if not exchanges:
+                return None
+            index = min(self.served[key], len(exchanges) - 1)
+            self.served[key] += 1
+            return exchanges[index]
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Sends the requests over the network like the default adapter and records every exchange in the archive.
+    """
+
+    def __init__(self, archive: HttpArchive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.archive.record(request, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Serves the exchanges of an archive without touching the network.
+
+    :param latency: Seconds to wait before every response, to mimic the site.
+    :param jitter: Fraction by which the latency varies, drawn from a seeded generator so runs are repeatable.
+    """
+
+    def __init__(self, archive: HttpArchive, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        super().__init__()
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        exchange = self.archive.next_exchange(request)
+        if self.latency:
+            with self.lock:
+                delay = self.latency * (1 + self.random.uniform(-self.jitter, self.jitter))
+            time.sleep(max(0.0, delay))
+        if exchange is None:
+            raise requests.ConnectionError(f'No recorded response for {request.method} {request.url}',
+                                           request=request)
+        return build_response(request, exchange['status'], base64.b64decode(exchange['content']),
+                              exchange['headers'], exchange.get('reason'))
+
+    def close(self):
+        pass
+
+
+def build_response(request: requests.PreparedRequest, status: int, content: bytes, headers: dict,
+                   reason: Optional[str] = None) -> requests.Response:
+    """
+    Build the response a transport adapter hands back to the session, including what the session needs to follow
+    redirects.
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.reason = reason or ''
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response._content_consumed = True
+    response.raw = io.BytesIO(content)
+    response.url = request.url
+    response.request = request
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
@@ -0,0 +1,162 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from config.settings import reminder_compact_interval, reminder_compact_events
+from storage.storageinterface import StorageInterface
+from storage.storagemanager import StorageManager
+
+
+class ReminderLedger:
+    """
+    The reminder state of every chat: the date of the last reminder, the amount of reminders sent in the current
+    round and, once a round went unanswered, the date the chat was banned from new campaigns.
+
+    Every reminder is appended to the ledger of the reminders table as it happens, a single insert that survives a
+    crash. The ledger is folded into the reminders table, which holds one row per chat and is pushed to
+    chats_no_response.csv, once compact_events reminders were recorded or compact_interval seconds passed since the
+    last compaction, when compact is called, and on first use for reminders a previous run did not fold.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ReminderLedger, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, storage: Optional[StorageInterface] = None,
+                 compact_interval: float = reminder_compact_interval, compact_events: int = reminder_compact_events):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.storage = storage
+        self.compact_interval = compact_interval
+        self.compact_events = compact_events
+        self.lock = threading.RLock()
+        # The rows appended since the last compaction, by chat url
+        self.pending = {}
+        self.events = 0
+        self.compacted_at = time.monotonic()
+        # The rows by the volunteer id of their chat, built on first use and dropped when the table changes
+        self.volunteer_index = None
+        self.subscribed = False
+
+    def __get_storage(self) -> StorageInterface:
+        with self.lock:
+            if self.storage is None:
+                self.storage = StorageManager.get_storage()
+                self.__compact()
+            if not self.subscribed:
+                self.storage.subscribe(self.__on_change)
+                self.subscribed = True
+            return self.storage
+
+    def __on_change(self, table: str, remote: bool) -> None:
+        if table == 'reminders':
+            with self.lock:
+                self.volunteer_index = None
+
+    def __get_volunteer_index(self) -> Dict[str, List[str]]:
+        """
+        This private method is used to index the rows by the volunteer id of their chat, the way chats were matched
+        to volunteers in chats_no_response.csv. Of the chats of a volunteer the first one stored is indexed.
+        """
+        storage = self.__get_storage()
+        with self.lock:
+            if self.volunteer_index is None:
+                volunteer_index = {}
+                for row in storage.all('reminders'):
+                    volunteer_index.setdefault(self.get_volunteer_id(row[0]), row)
+                self.volunteer_index = volunteer_index
+            return self.volunteer_index
+
+    @staticmethod
+    def get_volunteer_id(chat_url: str) -> str:
+        """
+        :return: The volunteer id a chat url ends with, without its query string or trailing slash.
+        """
+        return urlsplit(chat_url).path.rstrip('/').split('/')[-1]
+
+    def get(self, chat_url: str) -> Optional[List[str]]:
+        """
+        :return: The row [chat url, date of the last reminder, amount of reminders] of the chat, followed by the date
+                 of the ban if it has one, or None if it never got a reminder.
+        """
+        storage = self.__get_storage()
+        with self.lock:
+            row = self.pending.get(chat_url)
+        return row if row else storage.get('reminders', chat_url)
+
+    def get_many(self, chat_urls: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        :return: The rows of the chats that got a reminder, by chat url.
+        """
+        storage = self.__get_storage()
+        chat_urls = list(chat_urls)
+        rows = storage.get_many('reminders', chat_urls)
+        with self.lock:
+            rows.update({chat_url: self.pending[chat_url] for chat_url in chat_urls if chat_url in self.pending})
+        return rows
+
+    def get_by_volunteer_ids(self, volunteer_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        :return: The rows of the chats with the volunteers that got a reminder, by volunteer id.
+        """
+        volunteer_index = self.__get_volunteer_index()
+        volunteer_ids = set(volunteer_ids)
+        rows = {volunteer_id: volunteer_index[volunteer_id] for volunteer_id in volunteer_ids
+                if volunteer_id in volunteer_index}
+        with self.lock:
+            # The rows recorded since the last compaction are not in the table yet
+            for chat_url, row in self.pending.items():
+                volunteer_id = self.get_volunteer_id(chat_url)
+                if volunteer_id in volunteer_ids:
+                    rows[volunteer_id] = row
+        return rows
+
+    def record(self, chat_url: str, date: str, counter: int, banned_at: Optional[str] = None) -> None:
+        """
+        Record the state of a chat after a reminder.
+
+        :param chat_url: The url of the chat.
+        :param date: The date of the reminder, as YYYY-MM-DD.
+        :param counter: The amount of reminders sent in the current round.
+        :param banned_at: The date the chat was banned, as YYYY-MM-DD. Defaults to the ban the chat already has, so
+                          starting a new round does not lift it.
+        """
+        storage = self.__get_storage()
+        row = [chat_url, date, str(counter)]
+        with self.lock:
+            if banned_at is None:
+                previous = self.get(chat_url)
+                banned_at = previous[3] if previous and len(previous) > 3 else None
+            if banned_at:
+                row.append(banned_at)
+            storage.append('reminders', row)
+            self.pending[chat_url] = row
+            self.events += 1
+            if self.events >= self.compact_events or time.monotonic() - self.compacted_at >= self.compact_interval:
+                self.__compact()
+
+    def compact(self) -> int:
+        """
+        Fold the recorded reminders into the reminders table.
+
+        :return: The amount of reminders that were folded.
+        """
+        with self.lock:
+            if self.storage is None:
+                return 0
+            return self.__compact()
+
+    def __compact(self) -> int:
+        """
+        This private method is used to fold the ledger into the table, called with the lock held.
+        """
+        folded = self.storage.compact('reminders')
+        self.pending.clear()
+        self.events = 0
+        self.compacted_at = time.monotonic()
+        return folded
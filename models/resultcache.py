@@ -0,0 +1,81 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from config.settings import result_cache_path, result_cache_ttl, result_cache_max_entries
+
+
+class ResultCache:
+    """
+    Persistent cache for search results, keyed by the search url.
+
+    Entries expire after a time to live and the least recently used entries are evicted once the cache holds more
+    than max_entries. The cache is stored in a local SQLite file so it survives restarts.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ResultCache, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, path: str = result_cache_path, ttl: float = result_cache_ttl,
+                 max_entries: int = result_cache_max_entries):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results ('
+                                    'kind TEXT NOT NULL, url TEXT NOT NULL, value TEXT NOT NULL, '
+                                    'stored_at REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (kind, url))')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+
+    def get(self, kind: str, url: str) -> Optional[Any]:
+        """
+        Get a cached result.
+
+        :param kind: The kind of result, e.g. 'count' or 'ids'.
+        :param url: The search url.
+
+        :return: The cached value, or None if there is none or it has expired.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute('SELECT value, stored_at FROM results WHERE kind = ? AND url = ?',
+                                          (kind, url)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self.connection.execute('DELETE FROM results WHERE kind = ? AND url = ?', (kind, url))
+                return None
+            self.connection.execute('UPDATE results SET last_used = ? WHERE kind = ? AND url = ?', (now, kind, url))
+        return json.loads(row[0])
+
+    def set(self, kind: str, url: str, value: Any) -> None:
+        """
+        Store a result, evicting the least recently used entries if the cache is full.
+
+        :param kind: The kind of result, e.g. 'count' or 'ids'.
+        :param url: The search url.
+        :param value: A JSON serialisable value.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results (kind, url, value, stored_at, last_used) '
+                                    'VALUES (?, ?, ?, ?, ?)', (kind, url, json.dumps(value), now, now))
+            self.connection.execute('DELETE FROM results WHERE rowid IN (SELECT rowid FROM results '
+                                    'ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def clear(self) -> None:
+        """
+        Remove all the cached results.
+        """
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM results')
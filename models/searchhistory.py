@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+import time
+from typing import Iterable, List
+
+from config.settings import result_cache_path
+
+
+class SearchHistory:
+    """
+    Remembers the volunteer ids seen for every search url, so a repeated search only needs the new ones.
+
+    The ids are stored next to the ResultCache, without expiry.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(SearchHistory, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, path: str = result_cache_path):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS seen_volunteers ('
+                                    'url TEXT NOT NULL, volunteer_id TEXT NOT NULL, first_seen REAL NOT NULL, '
+                                    'PRIMARY KEY (url, volunteer_id))')
+
+    def get_seen(self, url: str) -> List[str]:
+        """
+        Get the volunteer ids seen for a search, the most recently found first and otherwise in page order.
+
+        :param url: The search url.
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT volunteer_id FROM seen_volunteers WHERE url = ? '
+                                           'ORDER BY first_seen DESC, rowid', (url,)).fetchall()
+        return [row[0] for row in rows]
+
+    def add_seen(self, url: str, volunteers_ids: Iterable[str]) -> None:
+        """
+        Remember volunteer ids as seen for a search.
+
+        :param url: The search url.
+        :param volunteers_ids: The ids, in page order.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany('INSERT OR IGNORE INTO seen_volunteers (url, volunteer_id, first_seen) '
+                                        'VALUES (?, ?, ?)', [(url, volunteer_id, now) for volunteer_id in volunteers_ids])
+
+    def forget(self, url: str) -> None:
+        """
+        Forget the volunteer ids seen for a search, so the next delta crawl goes through all the pages.
+        """
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM seen_volunteers WHERE url = ?', (url,))
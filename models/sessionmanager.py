@@ -1,11 +1,98 @@
+import threading
+from typing import List, Optional
+
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from config.settings import http_pool_size, http_keep_alive, http_keep_alive_expiry, http2_enabled, \
+    http_max_concurrency, http_transport_mode, http_archive_path, http_replay_latency
+from models.asynchttpclient import AsyncHttpClient
+from models.recordreplay import HttpArchive, RecordingAdapter, ReplayAdapter
+from services.ratelimiter import RateLimiter, PAGE_LOAD
+
+
+class PacedSession(requests.Session):
+    """
+    A session that takes a PAGE_LOAD token of the RateLimiter before every request, so all the requests of the
+    account share one pace, whichever service makes them.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        RateLimiter().acquire(PAGE_LOAD)
+        return super().request(method, url, *args, **kwargs)
 
 
 class SessionManager:
     _session = None
+    _async_client = None
+    _custom_transport = False
+    _lock = threading.Lock()
 
     @staticmethod
     def get_session():
         if SessionManager._session is None:
-            SessionManager._session = requests.Session()
+            with SessionManager._lock:
+                if SessionManager._session is None:
+                    SessionManager._session = SessionManager.__create_session()
         return SessionManager._session
+
+    @staticmethod
+    def __create_session() -> requests.Session:
+        """
+        Create the shared session, with a connection pool large enough for all the threads using it.
+        """
+        session = PacedSession()
+        if http_transport_mode == 'record':
+            adapter = RecordingAdapter(HttpArchive(http_archive_path), pool_connections=http_pool_size,
+                                       pool_maxsize=http_pool_size)
+            SessionManager._custom_transport = True
+        elif http_transport_mode == 'replay':
+            adapter = ReplayAdapter(HttpArchive(http_archive_path), latency=http_replay_latency)
+            SessionManager._custom_transport = True
+        else:
+            adapter = HTTPAdapter(pool_connections=http_pool_size, pool_maxsize=http_pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not http_keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    @staticmethod
+    def use_transport(adapter: BaseAdapter) -> None:
+        """
+        Send all the requests of the session through another transport adapter, e.g. a RecordingAdapter or a
+        ReplayAdapter. The asyncio client then goes through the session as well.
+        """
+        session = SessionManager.get_session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        with SessionManager._lock:
+            SessionManager._custom_transport = True
+            if SessionManager._async_client is not None:
+                SessionManager._async_client.close()
+                SessionManager._async_client = None
+
+    @staticmethod
+    def get_async_client() -> AsyncHttpClient:
+        """
+        Get the asyncio client, which shares its cookies with the session.
+        """
+        if SessionManager._async_client is None:
+            session = SessionManager.get_session()
+            with SessionManager._lock:
+                if SessionManager._async_client is None:
+                    SessionManager._async_client = AsyncHttpClient(
+                        session, http_pool_size, http_keep_alive, http_keep_alive_expiry, http2_enabled,
+                        http_max_concurrency, use_httpx=not SessionManager._custom_transport)
+        return SessionManager._async_client
+
+    @staticmethod
+    def fetch_all(urls: List[str], headers: Optional[dict] = None) -> list:
+        """
+        Get several urls concurrently over the pooled connections of the asyncio client.
+
+        :return: The responses, in the order of the urls.
+        """
+        if not urls:
+            return []
+        return SessionManager.get_async_client().fetch_all(urls, headers)
@@ -1,65 +1,46 @@
-import csv
-import io
+from typing import Iterable, List
 
 from google_drive.google_api_services import GoogleDriveManager
+from models.blacklistindex import BlacklistIndex
+
 
 class BlacklistService:
 
     def __init__(self):
         self.google_drive_manager = GoogleDriveManager()
+        self.blacklist_index = BlacklistIndex()
 
     def add_to_blacklist(self, profile_id: str):
-        # Find the file ID of the blacklisted_volunteers.csv file
-        file_id = self.google_drive_manager.find_file_id_by_name("blacklisted_volunteers.csv")
-        profile_id =  profile_id.strip()
-        # Download the existing content of the file
-        if file_id:
-            existing_content = self.google_drive_manager.download_file_content(file_id)
-            with io.StringIO(existing_content.decode('utf-8')) as file:
-                reader = csv.reader(file)
-                existing_blacklist = list(reader)
-        else:
-            # If file doesn't exist, create an empty list
-            existing_blacklist = []
+        profile_id = profile_id.strip()
 
         # Check if the user is already in the blacklist
-        if  profile_id in  [row[0] for row in existing_blacklist]:
+        if not self.blacklist_index.add([profile_id]):
             print(f"'{profile_id}' is already blacklisted.")
             return
 
-        # Add the new user to the blacklist
-        existing_blacklist.append([profile_id])
+        print(f"'{profile_id}' has been added to the blacklist.")
 
-        # Write the updated blacklist back to the CSV
-        with io.StringIO() as file_content:
-            writer = csv.writer(file_content)
-            writer.writerows(existing_blacklist)
-            file_content.seek(0)
-            self.google_drive_manager.upload_file_content(file_content.getvalue().encode('utf-8'), "blacklisted_volunteers.csv")
+    def add_many_to_blacklist(self, profile_ids: Iterable[str]) -> List[str]:
+        """Adds several user IDs to the blacklist at once.
 
-        print(f"'{profile_id}' has been added to the blacklist.")
+        Returns:
+            The IDs that were not blacklisted yet.
+        """
+        return self.blacklist_index.add(profile_id.strip() for profile_id in profile_ids)
 
     def get_blacklisted_users(self) -> [str]:
-        # Find the file ID of the blacklisted_volunteers.csv file
-        file_id = self.google_drive_manager.find_file_id_by_name("blacklisted_volunteers.csv")
-
-        if file_id:
-            # Download the existing content of the file
-            existing_content = self.google_drive_manager.download_file_content(file_id)
-            with io.StringIO(existing_content.decode('utf-8')) as file:
-                reader = csv.reader(file)
-                blacklisted_users = [row[0] for row in reader]
-            return blacklisted_users
-        else:
-            # If file doesn't exist, return an empty list
-            return []
+        return self.blacklist_index.get_all()
 
     def check_if_was_blacklisted(self, profile_id: str) -> bool:
-        ids = self.get_blacklisted_users()
-        if profile_id in ids:
-            return True
+        return self.blacklist_index.contains(profile_id)
+
+    def filter_blacklisted(self, profile_ids: Iterable[str]) -> List[str]:
+        """Leaves the blacklisted user IDs out.
 
-        return False
+        Returns:
+            The IDs that are not blacklisted, in the order given.
+        """
+        return self.blacklist_index.filter_blacklisted(profile_ids)
 
     def remove_from_blacklist(self, profile_id: str):
         """Removes a user ID from the blacklist CSV file.
@@ -67,37 +48,19 @@ class BlacklistService:
         Args:
             profile_id: The ID of the user to remove from the blacklist.
         """
-        # Find the file ID of the blacklisted_volunteers.csv file
-        file_id = self.google_drive_manager.find_file_id_by_name("blacklisted_volunteers.csv")
         profile_id = profile_id.strip()
 
-        # Download the existing content of the file
-        if file_id:
-            existing_content = self.google_drive_manager.download_file_content(file_id)
-            with io.StringIO(existing_content.decode('utf-8')) as file:
-                reader = csv.reader(file)
-                existing_blacklist = list(reader)
-        else:
-            # If file doesn't exist, there's nothing to delete
-            print("Blacklist file not found. No users to remove.")
-            return
-
         # Check if the user is in the blacklist
-        if profile_id not in [row[0] for row in existing_blacklist]:
+        if not self.blacklist_index.remove([profile_id]):
             print(f"'{profile_id}' is not currently blacklisted.")
             return
 
-        # Filter out the user from the blacklist
-        filtered_blacklist = [row for row in existing_blacklist if row[0] != profile_id]
-
-        # Write the updated blacklist back to the CSV
-        with io.StringIO() as file_content:
-            writer = csv.writer(file_content)
-            writer.writerows(filtered_blacklist)
-            file_content.seek(0)
-            self.google_drive_manager.upload_file_content(file_content.getvalue().encode('utf-8'),
-                                                          "blacklisted_volunteers.csv")
-
         print(f"'{profile_id}' has been removed from the blacklist.")
 
+    def remove_many_from_blacklist(self, profile_ids: Iterable[str]) -> List[str]:
+        """Removes several user IDs from the blacklist at once.
 
+        Returns:
+            The IDs that were blacklisted.
+        """
+        return self.blacklist_index.remove(profile_id.strip() for profile_id in profile_ids)
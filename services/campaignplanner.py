@@ -0,0 +1,79 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from models.blacklistindex import BlacklistIndex
+from models.campaignplan import CampaignPlan
+from models.contactsstore import ContactsStore
+from models.reminderledger import ReminderLedger
+
+# The reasons a recipient is skipped
+CONTACTED_RECENTLY = 'contacted_recently'
+NO_RESPONSE_BAN = 'no_response_ban'
+BLACKLISTED = 'blacklisted'
+
+
+class CampaignPlanner:
+    """
+    Decides which recipients of a campaign can be messaged, before any message goes out.
+    """
+
+    def __init__(self):
+        self.contacts_store = ContactsStore()
+        self.reminder_ledger = ReminderLedger()
+        self.blacklist_index = BlacklistIndex()
+
+    @staticmethod
+    def is_banned(reminder_row: Optional[List[str]]) -> bool:
+        """
+        :param reminder_row: The reminder row of the chat with the volunteer, or None if there is none.
+
+        :return: True if the chat was banned for a round of unanswered reminders less than 12 months ago, False
+                 otherwise.
+        """
+        if not reminder_row or len(reminder_row) < 3:
+            return False
+        if len(reminder_row) > 3 and reminder_row[3]:
+            banned_at = reminder_row[3]
+        elif int(reminder_row[2]) > 4:
+            # A ban row written before the ban was kept next to the counter
+            banned_at = reminder_row[1]
+        else:
+            return False
+        today = date.today()
+        twelve_months_ago = today.replace(year=today.year - 1)
+        return datetime.strptime(banned_at, '%Y-%m-%d').date() > twelve_months_ago
+
+    def plan_campaign(self, recipient_ids: Iterable[str],
+                      profile_ids: Optional[Dict[str, str]] = None) -> CampaignPlan:
+        """
+        Check all the recipients against the contact dates, the reminder bans and the blacklist at once. The rules
+        are the ones pre_send_message_check and the blacklist check apply to a single recipient, in that order.
+
+        :param recipient_ids: The volunteer ids to message.
+        :param profile_ids: The profile id of the volunteers, by volunteer id, where known. Recipients are checked
+                            against the blacklist by volunteer id and by profile id.
+
+        :return: The recipients that can be messaged, in order and without repeats, and the reason the others are
+                 skipped.
+        """
+        profile_ids = profile_ids or {}
+        unique_ids = list(dict.fromkeys(recipient_ids))
+
+        last_contacts = self.contacts_store.get_last_contacts(unique_ids)
+        reminder_rows = self.reminder_ledger.get_by_volunteer_ids(unique_ids)
+        not_blacklisted = set(self.blacklist_index.filter_blacklisted(unique_ids))
+        profiles_not_blacklisted = set(self.blacklist_index.filter_blacklisted(profile_ids.values()))
+
+        sendable = []
+        skipped = {}
+        for volunteer_id in unique_ids:
+            profile_id = profile_ids.get(volunteer_id)
+            if self.contacts_store.is_recent(last_contacts.get(volunteer_id)):
+                skipped[volunteer_id] = CONTACTED_RECENTLY
+            elif self.is_banned(reminder_rows.get(volunteer_id)):
+                skipped[volunteer_id] = NO_RESPONSE_BAN
+            elif volunteer_id not in not_blacklisted or (profile_id and profile_id not in profiles_not_blacklisted):
+                skipped[volunteer_id] = BLACKLISTED
+            else:
+                sendable.append(volunteer_id)
+        return CampaignPlan(sendable, skipped)
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from config.settings import autocomplete_debounce, autocomplete_cache_size, autocomplete_result_limit
+from services.locationautocompleteservice import LocationAutocompleteService
+
+
+class LocationAutocompleteEngine:
+    """
+    Looks up locations while the user is typing.
+
+    Lookups are debounced, a lookup superseded by a newer one is dropped before or after it runs, and only the
+    answer to the latest lookup is handed to the callback. Answers are cached by prefix: when a shorter prefix
+    returned fewer results than the autocomplete limit, it holds every match of a longer prefix, which are then
+    filtered locally without a request.
+
+    The requests run on the debounce timer, or through submit when given, e.g. on a TaskScheduler lane. A queued
+    request is cancelled once it is superseded.
+    """
+
+    def __init__(self, fetch: Callable[[str], list] = LocationAutocompleteService.get_location_autocomplete,
+                 submit: Optional[Callable[..., Future]] = None, debounce: float = autocomplete_debounce,
+                 cache_size: int = autocomplete_cache_size, result_limit: int = autocomplete_result_limit):
+        self.fetch = fetch
+        self.submit = submit
+        self.future = None
+        self.debounce = debounce
+        self.cache_size = cache_size
+        self.result_limit = result_limit
+        self.cache = OrderedDict()
+        self.sequence = 0
+        self.timer = None
+        self.lock = threading.Lock()
+        self.delivery_lock = threading.Lock()
+
+    def request(self, location: str, callback: Callable[[list], None]) -> None:
+        """
+        Look up a location, superseding any earlier lookup.
+
+        :param location: The text typed so far.
+        :param callback: Receives the list of locations, unless a newer lookup was requested in the meantime.
+        """
+        term = location.strip().lower()
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if self.future:
+                self.future.cancel()
+                self.future = None
+            cached = self.__lookup(term)
+            if cached is None:
+                self.timer = threading.Timer(self.debounce, self.__schedule_fetch,
+                                             args=(location, term, sequence, callback))
+                self.timer.daemon = True
+                self.timer.start()
+
+        if cached is not None:
+            self.__deliver(sequence, callback, cached)
+
+    def __schedule_fetch(self, location: str, term: str, sequence: int, callback: Callable[[list], None]) -> None:
+        """
+        This private method is used to start the request once the debounce delay has passed.
+        """
+        with self.lock:
+            if sequence != self.sequence:
+                return
+            if self.submit:
+                self.future = self.submit(self.__fetch, location, term, sequence, callback)
+                return
+        self.__fetch(location, term, sequence, callback)
+
+    def __fetch(self, location: str, term: str, sequence: int, callback: Callable[[list], None]) -> None:
+        if sequence != self.sequence:
+            return
+        data = self.fetch(location)
+        if data:
+            with self.lock:
+                self.cache[term] = data
+                self.cache.move_to_end(term)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        self.__deliver(sequence, callback, data)
+
+    def __deliver(self, sequence: int, callback: Callable[[list], None], data: list) -> None:
+        with self.delivery_lock:
+            if sequence == self.sequence:
+                callback(list(data))
+
+    def __lookup(self, term: str) -> Optional[List[dict]]:
+        """
+        Find the locations for a term in the cache, either for the term itself or filtered from a shorter prefix
+        whose results were not cut off by the autocomplete limit.
+        """
+        if term in self.cache:
+            self.cache.move_to_end(term)
+            return self.cache[term]
+        for length in range(len(term) - 1, 0, -1):
+            items = self.cache.get(term[:length])
+            if items is not None and len(items) < self.result_limit:
+                self.cache.move_to_end(term[:length])
+                return [item for item in items if self.__matches(item, term)]
+        return None
+
+    @staticmethod
+    def __matches(item: dict, term: str) -> bool:
+        text = f"{item.get('name') or ''} {item.get('subtitle') or ''}".lower()
+        return all(word in text for word in term.split())
@@ -1,19 +1,22 @@
 import logging
-import random
-import time
-from typing import Optional, List
+from itertools import islice
+from typing import Optional, List, Iterable, Iterator, Set
 
 from google_drive.google_api_services import GoogleDriveManager
+from models.campaignplan import CampaignPlan
+from models.offerpage import OfferPage
+from models.profileidcache import ProfileIdCache, PROFILE_ID
 from services.blacklistservice import BlacklistService
-from utils.csv_util.csv_util import contact_date_to_csv, pre_send_message_check
+from services.campaignplanner import CampaignPlanner
+from services.ratelimiter import RateLimiter, MESSAGE
+from services.sendengine import SendEngine
 
-from config.settings import headers, url_volunteer, minimum_time, maximum_time, url_base
+from config.settings import headers, url_volunteer, url_base, send_verify_pages, volunteers_per_page
 from controllers.logincontroller import LoginController
 from controllers.logincontrollerinterface import LoginControllerInterface
 from models.sessionmanager import SessionManager
-from bs4 import BeautifulSoup
 
-from utils.profile_id_extractor import get_profile_id
+from utils.html_parser import parse_html, INBOX_OFFER_LINKS
 
 
 class MessagingService:
@@ -26,63 +29,97 @@ class MessagingService:
         self.password = None
         self.username = None
         self.notifier = None
-        self.delay_to_start_sending = random.uniform(10.141516, 29.141516)
         self.loginController = loginController if loginController else LoginController()
         self.google_drive_manager = GoogleDriveManager()
         self.blService = BlacklistService()
+        self.campaign_planner = CampaignPlanner()
 
     def send_messages(self, notifier, username: str, password: str, message: str, phoneNumber: str,
                       recipients: List[str]) -> None:
+        # The profile ids resolved in earlier campaigns are checked against the blacklist right away
+        profile_ids = ProfileIdCache().get_cached(PROFILE_ID, recipients)
+        plan = self.campaign_planner.plan_campaign(recipients, profile_ids)
+        print(f"{len(plan.sendable)} of {len(recipients)} recipients can be messaged")
+        notifier.notify_campaign_plan(plan)
+        self.send_messages_stream(notifier, username, password, message, phoneNumber, recipients, plan)
+
+    def send_messages_stream(self, notifier, username: str, password: str, message: str, phoneNumber: str,
+                             recipients: Iterable[str], plan: Optional[CampaignPlan] = None) -> None:
+        """
+        Send the message to the recipients as they come in.
+
+        The recipients can be a lazy iterator, such as VolunteerService.iter_volunteers, so the first message
+        goes out while later result pages are still being loaded.
+
+        :param recipients: The volunteer ids to send the message to.
+        :param plan: The plan of the campaign, if it was made in advance. Otherwise the recipients are planned
+                     in batches of a result page as they come in.
+        """
         self.notifier = notifier
         self.username = username
         self.password = password
         self.message = message
         self.phoneNumber = phoneNumber
         self.recipients = recipients
-        current_recipient = 0
-        self.notifier.notify_starting_messaging(self.delay_to_start_sending)
-        time.sleep(self.delay_to_start_sending)
-        for recipient in self.recipients:
-            if pre_send_message_check(recipient, self.google_drive_manager):
-                if self.__send_message(recipient):
-                    time.sleep(1)
-                    if self.check_if_message_was_sent(recipient):
-                        contact_date_to_csv(recipient, self.google_drive_manager)
-                    else:
-                        print(f"Failed to send message to {recipient}")
-            else:
-                pass
-
-            current_recipient += 1
-            self.notifier.notify_progress_message_sending(current_recipient)
-            if current_recipient != len(self.recipients):
-                time.sleep(random.uniform(minimum_time, maximum_time))
-
-    def __send_message(self, volunteer_id: str) -> bool:
-        url = f'{url_volunteer}{volunteer_id}?showMessage=1'
-        profile_id= get_profile_id(url)
-        if self.blService.check_if_was_blacklisted(profile_id):
-            print(f"Volunteer with id {profile_id} was blacklisted")
-            return False
+        if plan is None:
+            plan = CampaignPlan([], {})
+            self.recipients = self.__plan_in_batches(self.recipients, plan)
+        # The messages are paced by the RateLimiter, together with the reminders being sent meanwhile
+        self.notifier.notify_starting_messaging(RateLimiter().get_wait(MESSAGE))
+        SendEngine(self, self.campaign_planner, self.blService).run(self.notifier, self.recipients, plan)
+
+    def __plan_in_batches(self, recipients: Iterable[str], plan: CampaignPlan) -> Iterator[str]:
+        """
+        This private method is used to plan streamed recipients a batch at a time, adding every batch to the plan
+        before its recipients are handed out. The notifier gets the plan so far after every batch.
+        """
+        recipients = iter(recipients)
+        while True:
+            batch = list(islice(recipients, volunteers_per_page))
+            if not batch:
+                return
+            plan.extend(self.campaign_planner.plan_campaign(batch, ProfileIdCache().get_cached(PROFILE_ID, batch)))
+            self.notifier.notify_campaign_plan(plan)
+            yield from batch
+
+    def fetch_offer_page(self, volunteer_id: str) -> Optional[OfferPage]:
+        """
+        Load the offer page of a volunteer, which holds both their profile id and the message form.
+
+        :param volunteer_id: The id of the volunteer.
+
+        :return: The offer page, or None if it could not be loaded or has no message form.
+        """
+        try:
+            offer_page = OfferPage.load(volunteer_id)
+            if offer_page is not None and offer_page.form is not None:
+                return offer_page
+            logging.error(f'Error while sending message to volunteer with id {volunteer_id}: '
+                          f'Could not get message page')
+            return None
+        except Exception as e:
+            logging.error(f'Error while sending message to volunteer with id {volunteer_id}: {e.__str__()}')
+            return None
+
+    def submit_message(self, volunteer_id: str, form: dict) -> bool:
+        """
+        Post the message with the hidden fields of a message form.
+
+        :param volunteer_id: The id of the volunteer.
+        :param form: The hidden fields of the form of the offer page.
+
+        :return: True if the site accepted the message, False otherwise.
+        """
+        url = OfferPage.get_url(volunteer_id)
+        data = {
+            'message[body]': self.message,
+            'message[phoneNumber]': self.phoneNumber,
+            'message[dusdat]': '',
+            'message[_token]': form['message[_token]'],
+            'message[loaded]': form['message[loaded]']}
         try:
-            response = SessionManager.get_session().get(url, headers=headers)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                message_token = soup.find('input', {'name': 'message[_token]'})['value']
-                message_loaded = soup.find('input', {'name': 'message[loaded]'})['value']
-                data = {
-                    'message[body]': self.message,
-                    'message[phoneNumber]': self.phoneNumber,
-                    'message[dusdat]': '',
-                    'message[_token]': message_token,
-                    'message[loaded]': message_loaded}
-            else:
-                logging.error(f'Error while sending message to volunteer with id {volunteer_id}: '
-                              f'Could not get message page')
-                return False
             response = SessionManager.get_session().post(url, data=data, headers=headers)
             if response.status_code != 200:
-                time.sleep(1)
                 logging.error(f'Error while sending message to volunteer with id {volunteer_id}: '
                               f'Server responded with status code {response.status_code}')
                 print(f'Error while sending message to volunteer with id {volunteer_id}: '
@@ -97,45 +134,37 @@ class MessagingService:
             logging.error(f'Error while sending message to volunteer with id {volunteer_id}: {e.__str__()}')
             return False
 
-    def check_if_message_was_sent(self, volunteer_id: str):
+    def verify_sent(self, volunteer_ids: Iterable[str], pages: int = send_verify_pages) -> Set[str]:
         """
-        Check if the message was sent to the volunteer.
+        Find the volunteers a message was sent to in the messages inbox. The inbox is read from the newest
+        conversation on, until all the volunteers were found or the given amount of pages was read.
 
-        :param volunteer_id: The id of the volunteer.
+        :param volunteer_ids: The ids of the volunteers messaged.
+        :param pages: How many pages of the inbox to look back at most.
 
-        :return: True if the message was sent, False otherwise.
+        :return: The ids of the volunteers with a conversation in the inbox.
         """
-
-        url = "https://www.nlvoorelkaar.nl/mijn-pagina/berichten"
-        try:
-            response = SessionManager.get_session().get(url, headers=headers)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                volunteer_names = soup.find_all('a', {'aria-labelledby': 'ad-label'})[:1]
-                # extract href from volunteer names
-                volunteer_ids = [volunteer_name['href'].split('/')[-1] for volunteer_name in volunteer_names]
-                result = False
-                for volunteer in volunteer_ids:
-                    if volunteer == volunteer_id:
-                        result = True
-                        break
-                if not result:
-                    logging.error(f'Could not find message sent to volunteer with id {volunteer_id}')
-                    self.notifier.notify_message_not_sent(volunteer_id)
-                    return False
-                else:
-                    logging.info(f'Message was sent to volunteer with id {volunteer_id}')
-                    print(f'Message to {volunteer_id} was found in messages page')
-                    return True
-            else:
-                logging.error(f'Error while checking if message was sent to volunteer with id {volunteer_id}: '
-                              f'Could not get messages page')
-                print(f'Error while checking if message was sent to volunteer with id {volunteer_id}: '
-                              f'Could not get messages page')
-                return False
-
-        except Exception as e:
-            logging.error(f'Error while checking if message was sent to volunteer with id {volunteer_id}: {str(e)}')
-            return False
-
-
+        missing = set(volunteer_ids)
+        found = set()
+        for page in range(1, pages + 1):
+            if not missing:
+                break
+            url = "https://www.nlvoorelkaar.nl/mijn-pagina/berichten" + (f'?p={page}' if page > 1 else '')
+            try:
+                response = SessionManager.get_session().get(url, headers=headers)
+                if response.status_code != 200:
+                    logging.error(f'Error while checking the messages sent: Could not get messages page {page}')
+                    print(f'Error while checking the messages sent: Could not get messages page {page}')
+                    break
+                soup = parse_html(response.text, INBOX_OFFER_LINKS)
+                offer_links = soup.find_all('a', {'aria-labelledby': 'ad-label'})
+            except Exception as e:
+                logging.error(f'Error while checking the messages sent: {str(e)}')
+                break
+            # extract the offer ids from the links of the conversations
+            offer_ids = {offer_link['href'].split('/')[-1] for offer_link in offer_links}
+            found |= missing & offer_ids
+            missing -= offer_ids
+            if not offer_links:
+                break
+        return found
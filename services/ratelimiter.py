@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config.settings import rate_limit_per_hour, rate_limit_burst, rate_limit_jitter
+
+# The actions paced by the rate limiter
+MESSAGE = 'message'  # a message posted to a volunteer
+REMINDER = 'reminder'  # a reminder posted in a chat
+PAGE_LOAD = 'page_load'  # a request of the shared session, see SessionManager
+
+
+class TokenBucket:
+    """
+    Holds up to burst tokens, refilled at rate tokens per second. A token is reserved when it is acquired, so
+    concurrent callers queue up behind each other instead of all waking up when a token comes in.
+    """
+
+    def __init__(self, rate: float, burst: int, jitter: float, now: float):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.jitter = jitter
+        self.tokens = float(self.burst)
+        self.updated_at = now
+
+    def __refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def get_wait(self, now: float) -> float:
+        """
+        :return: The seconds until a token is available, without the jitter.
+        """
+        self.__refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def reserve(self, now: float) -> float:
+        """
+        Take a token, possibly one that is not there yet. The random jitter is taken from the bucket as well, so
+        the callers after this one wait for it too.
+
+        :return: The seconds to wait before using the token.
+        """
+        jitter = random.uniform(0, self.jitter)
+        wait = self.get_wait(now) + jitter
+        self.tokens -= 1 + jitter * self.rate
+        return wait
+
+
+class RateLimiter:
+    """
+    Paces the requests of all the senders, so campaigns and reminder runs going on at the same time stay within
+    the limits of the site together.
+
+    Every account has a token bucket per action: MESSAGE, REMINDER and PAGE_LOAD. A sender acquires a token from it
+    right before the request, and the SessionManager acquires a PAGE_LOAD token for every request of the shared
+    session. Acquiring waits until the bucket allows it, plus a random jitter of up to the jitter seconds of the
+    action. The rates, bursts and jitters of the actions are set in rate_limit_per_hour, rate_limit_burst and
+    rate_limit_jitter.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(RateLimiter, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, per_hour: Optional[Dict[str, float]] = None, burst: Optional[Dict[str, int]] = None,
+                 jitter: Optional[Dict[str, float]] = None, clock: Callable[[], float] = time.monotonic):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.per_hour = dict(rate_limit_per_hour if per_hour is None else per_hour)
+        self.burst = dict(rate_limit_burst if burst is None else burst)
+        self.jitter = dict(rate_limit_jitter if jitter is None else jitter)
+        self.clock = clock
+        self.lock = threading.Lock()
+        # The account logged in on the shared session, used when no account is given
+        self.account = None
+        # (account, action) -> TokenBucket
+        self.buckets = {}
+        self.waited = {action: 0.0 for action in self.per_hour}
+
+    def use_account(self, account: Optional[str]) -> None:
+        """
+        Set the account the requests of the shared session are made for, e.g. after a login.
+        """
+        with self.lock:
+            self.account = account
+
+    def __get_bucket(self, action: str, account: Optional[str]) -> TokenBucket:
+        """
+        This private method is used to get the bucket of an action of an account, creating it full on first use.
+        Called with the lock held.
+        """
+        key = (account if account is not None else self.account, action)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.per_hour[action] / 3600, self.burst.get(action, 1),
+                                 self.jitter.get(action, 0), self.clock())
+            self.buckets[key] = bucket
+        return bucket
+
+    def reserve(self, action: str, account: Optional[str] = None) -> float:
+        """
+        Take a token for an action without waiting for it, e.g. to wait with asyncio.sleep instead.
+
+        :param action: MESSAGE, REMINDER or PAGE_LOAD.
+        :param account: The account the action is made for, defaults to the account of the shared session.
+
+        :return: The seconds to wait before the action.
+        """
+        with self.lock:
+            wait = self.__get_bucket(action, account).reserve(self.clock())
+            self.waited[action] += wait
+        return wait
+
+    def acquire(self, action: str, account: Optional[str] = None) -> float:
+        """
+        Wait until an action is allowed.
+
+        :param action: MESSAGE, REMINDER or PAGE_LOAD.
+        :param account: The account the action is made for, defaults to the account of the shared session.
+
+        :return: The seconds waited.
+        """
+        wait = self.reserve(action, account)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def get_wait(self, action: str, account: Optional[str] = None) -> float:
+        """
+        :return: The seconds an acquire of the action would wait at least right now.
+        """
+        with self.lock:
+            return self.__get_bucket(action, account).get_wait(self.clock())
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get the seconds waited for every action since the start.
+        """
+        with self.lock:
+            return dict(self.waited)
@@ -1,24 +1,25 @@
-import csv
-from random import randint
-from googleapiclient.errors import HttpError
 
 from google_drive.google_api_services import GoogleDriveManager
-import time
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 from typing import Optional
-import io
 import logging
 
 from config.settings import headers
 from controllers.logincontroller import LoginController
 from controllers.logincontrollerinterface import LoginControllerInterface
+from models.profileidcache import ProfileIdCache, PROFILE_ID, OFFER_URL
+from models.reminderledger import ReminderLedger
 from models.sessionmanager import SessionManager
-from bs4 import BeautifulSoup, PageElement
+from bs4 import PageElement
 
 from models.stringlist import StringLists
 from services.blacklistservice import BlacklistService
-from utils.profile_id_extractor import get_profile_id, get_offer_url_from_chat_page
+from services.ratelimiter import RateLimiter, REMINDER
+from storage.storagemanager import StorageManager
+from utils.html_parser import parse_html, INBOX_PAGINATOR, INBOX_NAMES, MESSAGE_FORM, INBOX_CONVERSATIONS, \
+    CONVERSATION_METAS, PROFILE_FORM, CONVERSATION_DETAILS
+from utils.profile_id_extractor import get_profile_id, get_offer_url_from_chat_page, get_offer_id
 
 
 class ReminderService:
@@ -49,13 +50,17 @@ class ReminderService:
             reminder_message or None,
         )
 
+        storage = StorageManager.get_storage()
+        stored_settings = storage.all('reminder_settings')[:1]
         if not reminder_frequency or not reminder_message:
-            stored_frequency, stored_message = self.google_drive_manager.read_frequency_data()
+            stored_frequency, stored_message = stored_settings[0][:2] if stored_settings and \
+                len(stored_settings[0]) > 1 else (None, None)
             reminder_frequency = reminder_frequency or stored_frequency or DEFAULT_FREQUENCY
             reminder_message = reminder_message or stored_message or DEFAULT_MESSAGE
 
-        if reminder_frequency and reminder_message:
-            self.google_drive_manager.write_frequency_data(reminder_frequency, reminder_message)
+        if reminder_frequency and reminder_message and \
+                stored_settings != [[str(reminder_frequency), str(reminder_message)]]:
+            storage.replace('reminder_settings', [[reminder_frequency, reminder_message]])
 
         print('Reminder frequency: ', reminder_frequency)
         print('Reminder message: ', reminder_message)
@@ -86,7 +91,7 @@ class ReminderService:
         urls.append(url)
         response = SessionManager.get_session().get(url, headers=headers)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = parse_html(response.text, INBOX_PAGINATOR)
             paginator = soup.find('div', {'class': 'paginator'})
 
             if paginator:
@@ -98,9 +103,8 @@ class ReminderService:
                             url = f'https://www.nlvoorelkaar.nl/mijn-pagina/berichten?p={page_number}'
                             urls.append(url)
             volunteers_names = []
-            for url in urls:
-                response = SessionManager.get_session().get(url, headers=headers)
-                soup = BeautifulSoup(response.text, 'html.parser')
+            for response in SessionManager.fetch_all(urls, headers=headers):
+                soup = parse_html(response.text, INBOX_NAMES)
                 volunteers = soup.find_all('a', {'aria-labelledby': 'message-of-label'})
                 for volunteer_name in volunteers:
                     volunteers_names.append(volunteer_name.text)
@@ -180,7 +184,7 @@ class ReminderService:
         try:
             response = SessionManager.get_session().get(chat_url, headers=headers)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = parse_html(response.text, MESSAGE_FORM)
                 message_token = soup.find('input', {'name': 'message[_token]'})['value']
                 message_loaded = soup.find('input', {'name': 'message[loaded]'})['value']
 
@@ -191,7 +195,8 @@ class ReminderService:
                     'message[loaded]': message_loaded
                 }
 
-                time.sleep(randint(45, 75))
+                # Waits for the reminders and the messages sent before, in this run or a campaign
+                RateLimiter().acquire(REMINDER)
                 response = SessionManager.get_session().post(chat_url, data=data, headers=headers)
 
                 if response.status_code == 200:
@@ -207,73 +212,47 @@ class ReminderService:
             print("No chats with no response")
             return
 
-        file_id = self.google_drive_manager.find_file_id_by_name("chats_no_response.csv")
-        if file_id:
-            try:
-                file_content = self.google_drive_manager.download_file_content(file_id)
-            except HttpError as error:
-                print(f"An error occurred while downloading the file: {error}")
-                return
-        else:
-            file_content = None
-
-        # Read the CSV content
-        rows_in_file = []
-        if file_content:
-            file_stream = io.StringIO(file_content.decode('utf-8'))
-            reader = csv.reader(file_stream)
-            rows_in_file = list(reader)
-
-        updated_rows = []
+        # Every reminder is recorded in the ledger as it is sent, the ledger is folded into the reminder counters
+        # after the run
+        reminder_ledger = ReminderLedger()
+        rows_in_storage = reminder_ledger.get_many(chats_with_no_response)
+
+        # The offers and profiles of the chats resolved in earlier runs are loaded at once
+        offer_urls = ProfileIdCache().get_cached(OFFER_URL, chats_with_no_response)
+        ProfileIdCache().get_cached(PROFILE_ID, [get_offer_id(offer_url) for offer_url in offer_urls.values()])
+
         today = date.today()
         six_months_ago = today - relativedelta(months=6)
 
         for chat_url in chats_with_no_response:
-            chat_exists = False
-            for i, row in enumerate(rows_in_file):
-                if len(row) > 0 and row[0] == chat_url:
-                    chat_exists = True
-                    last_contact_date = datetime.strptime(row[1], '%Y-%m-%d').date()
-                    if self.check_with_frequency(row[1], reminder_frequency) and int(row[2]) < 4:
-                        rows_in_file[i] = [chat_url, datetime.now().strftime('%Y-%m-%d'), str(int(row[2]) + 1)]
-                        reminder_msg = reminder_message if reminder_message else self.construct_message(chat_url)
-                        self.send_reminder(chat_url, reminder_msg)
-
-                    elif self.check_with_frequency(row[1], reminder_frequency) and int(
-                            row[2]) == 4 and not last_contact_date <= six_months_ago:
-                        print(f"Chat {chat_url} has been banned to send more reminders")
-                    elif not self.check_with_frequency(row[1], reminder_frequency):
-                        print(f"Message is not older than {reminder_frequency} days for {chat_url}")
-                    elif last_contact_date <= six_months_ago and int(row[2]) == 4:
-                        rows_in_file[i] = [chat_url, datetime.now().strftime('%Y-%m-%d'), str(5)]
-                        new_row = [chat_url, datetime.now().strftime('%Y-%m-%d'), '0']
-                        updated_rows.append(new_row)
-                        reminder_msg = reminder_message if reminder_message else self.construct_message(chat_url)
-                        self.send_reminder(chat_url, reminder_msg)
-                        print(f"New help request after 12 months for {chat_url}")
-
-            if not chat_exists:
-                new_row = [chat_url, datetime.now().strftime('%Y-%m-%d'), '0']
-                updated_rows.append(new_row)
+            row = rows_in_storage.get(chat_url)
+            if row:
+                last_contact_date = datetime.strptime(row[1], '%Y-%m-%d').date()
+                if self.check_with_frequency(row[1], reminder_frequency) and int(row[2]) < 4:
+                    reminder_ledger.record(chat_url, datetime.now().strftime('%Y-%m-%d'), int(row[2]) + 1)
+                    reminder_msg = reminder_message if reminder_message else self.construct_message(chat_url)
+                    self.send_reminder(chat_url, reminder_msg)
+
+                elif self.check_with_frequency(row[1], reminder_frequency) and int(
+                        row[2]) == 4 and not last_contact_date <= six_months_ago:
+                    print(f"Chat {chat_url} has been banned to send more reminders")
+                elif not self.check_with_frequency(row[1], reminder_frequency):
+                    print(f"Message is not older than {reminder_frequency} days for {chat_url}")
+                elif last_contact_date <= six_months_ago and int(row[2]) == 4:
+                    # The chat starts a new round of reminders, the unanswered round bans it from new campaigns
+                    reminder_ledger.record(chat_url, datetime.now().strftime('%Y-%m-%d'), 0,
+                                           banned_at=datetime.now().strftime('%Y-%m-%d'))
+                    reminder_msg = reminder_message if reminder_message else self.construct_message(chat_url)
+                    self.send_reminder(chat_url, reminder_msg)
+                    print(f"New help request after 12 months for {chat_url}")
+
+            else:
+                reminder_ledger.record(chat_url, datetime.now().strftime('%Y-%m-%d'), 0)
                 reminder_msg = reminder_message if reminder_message else self.construct_message(chat_url)
                 self.send_reminder(chat_url, reminder_msg)
                 print(f"Sent message to {chat_url}")
 
-        # Combine updated rows with existing ones, removing duplicates
-        unique_rows = {tuple(row) for row in updated_rows + rows_in_file}
-
-        # Write the updated CSV content to a string buffer
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerows(unique_rows)
-        output.seek(0)
-
-        # Upload the updated file to Google Drive
-        try:
-            self.google_drive_manager.upload_file_content(output.getvalue().encode('utf-8'),
-                                                          "chats_no_response.csv")
-        except HttpError as error:
-            print(f"An error occurred while uploading the file: {error}")
+        reminder_ledger.compact()
 
     def construct_message(self, chat_url: str) -> str:
         """
@@ -303,37 +282,38 @@ class ReminderService:
             urls = names_urls_object.pages
 
 
-            for url in urls:
-                response = SessionManager.get_session().get(url, headers=headers)
+            for response in SessionManager.fetch_all(urls, headers=headers):
 
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
+                    soup = parse_html(response.text, INBOX_CONVERSATIONS)
 
                     chats = soup.find_all('li', {'class': 'list__item list__item--messages'})
-
+                    chat_urls = []
                     for chat in chats:
                         chat_url = chat.find('a', {'class': 'button button--primary button--detail'})
                         if chat_url:
-                            chat_url = "https://www.nlvoorelkaar.nl" + chat_url['href']
+                            chat_urls.append("https://www.nlvoorelkaar.nl" + chat_url['href'])
 
-                            response = SessionManager.get_session().get(chat_url, headers=headers)
-                            soup = BeautifulSoup(response.text, 'html.parser')
-                            message_metas = soup.find_all('p', {'class': 'meta conversation__meta'})
+                    # The conversations of the page are fetched concurrently, then checked in order
+                    chat_responses = SessionManager.fetch_all(chat_urls, headers=headers)
+                    for chat_url, response in zip(chat_urls, chat_responses):
+                        soup = parse_html(response.text, CONVERSATION_METAS)
+                        message_metas = soup.find_all('p', {'class': 'meta conversation__meta'})
 
-                            if self.check_last_message_date(message_metas, int(reminder_frequency)):
-                                message_authors = []
-                                for message_meta in message_metas:
-                                    author = message_meta.text.split(' ')[0]
-                                    if author in volunteer_names and not self.check_60_days(message_meta):
-                                        message_authors.append(author)
+                        if self.check_last_message_date(message_metas, int(reminder_frequency)):
+                            message_authors = []
+                            for message_meta in message_metas:
+                                author = message_meta.text.split(' ')[0]
+                                if author in volunteer_names and not self.check_60_days(message_meta):
+                                    message_authors.append(author)
 
-                                if len(message_authors) == 0:
-                                    chats_with_no_response.add(chat_url)
+                            if len(message_authors) == 0:
+                                chats_with_no_response.add(chat_url)
 
-                                    continue
+                                continue
 
-                            else:
-                                pass
+                        else:
+                            pass
 
 
 
@@ -355,7 +335,7 @@ class ReminderService:
             url = 'https://www.nlvoorelkaar.nl/en/mijn-pagina/profiel'
             response = SessionManager.get_session().get(url, headers=headers)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = parse_html(response.text, PROFILE_FORM)
                 name = soup.find('input', {'id': 'user_profile_firstName'})['value']
                 return name
         except Exception as e:
@@ -377,7 +357,7 @@ class ReminderService:
 
                 response = SessionManager.get_session().get(chat_url, headers=headers)
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
+                    soup = parse_html(response.text, CONVERSATION_DETAILS)
                     # find by xpath
                     receiver_name = soup.find('dl', {
                         'class': 'list__definition list__definition--horizontal list__definition--plain list-definition--small'}).text.split(
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Set
+
+from config.settings import send_prefetch_depth, send_form_max_age, send_verify_batch, send_verify_attempts, \
+    send_verify_delay
+from models.campaignplan import CampaignPlan
+from models.contactsstore import ContactsStore
+from models.profileidcache import ProfileIdCache, PROFILE_ID
+from services.blacklistservice import BlacklistService
+from services.campaignplanner import CampaignPlanner
+from services.ratelimiter import RateLimiter, MESSAGE
+
+
+class PreparedMessage:
+    """
+    A recipient that went through the preparation stages, with what the submit needs.
+    """
+
+    def __init__(self, volunteer_id: str, reason: Optional[str] = None, profile_id: Optional[str] = None,
+                 form: Optional[dict] = None):
+        self.volunteer_id = volunteer_id
+        self.reason = reason
+        self.profile_id = profile_id
+        self.form = form
+        self.prepared_at = time.monotonic()
+
+
+class SendEngine:
+    """
+    Sends a message to recipients in a pipeline of stages: eligibility, profile resolution, form fetch, submit and
+    verify.
+
+    The submits are paced by the RateLimiter, which spaces the messages of an account. The preparation stages of
+    the next prefetch_depth recipients run on background workers during the wait, so only the submit is on the
+    critical path. Right before a submit the blacklist is checked again, and a form older than form_max_age seconds
+    is fetched again.
+
+    Submitted messages are verified in batches of verify_batch on a background worker: one scan of the inbox
+    confirms all of them, and their contact dates are recorded at once. Every scan starts verify_delay seconds
+    after it is due, so the inbox lists the last messages submitted. A message that is not found is looked for
+    again with the next batch, and reported once verify_attempts scans did not find it.
+    """
+
+    def __init__(self, messaging_service, campaign_planner: Optional[CampaignPlanner] = None,
+                 blacklist_service: Optional[BlacklistService] = None, prefetch_depth: int = send_prefetch_depth,
+                 form_max_age: float = send_form_max_age, verify_batch: int = send_verify_batch,
+                 verify_attempts: int = send_verify_attempts, verify_delay: float = send_verify_delay):
+        self.messaging_service = messaging_service
+        self.campaign_planner = campaign_planner or CampaignPlanner()
+        self.blacklist_service = blacklist_service or BlacklistService()
+        self.prefetch_depth = max(1, prefetch_depth)
+        self.form_max_age = form_max_age
+        self.verify_batch = max(1, verify_batch)
+        self.verify_attempts = max(1, verify_attempts)
+        self.verify_delay = verify_delay
+        self.lock = threading.Lock()
+        # The submitted messages not confirmed yet, by volunteer id, with the amount of scans that missed them
+        self.unverified = {}
+
+    def run(self, notifier, recipients: Iterable[str], plan: Optional[CampaignPlan] = None) -> int:
+        """
+        Send the message of the MessagingService to the recipients, in order.
+
+        :param notifier: Notified of the progress after every recipient.
+        :param recipients: The volunteer ids, possibly a lazy iterator.
+        :param plan: The plan of the campaign, if it was made in advance. Otherwise every recipient is checked
+                     as it is prepared.
+
+        :return: The amount of messages submitted.
+        """
+        recipients = iter(recipients)
+        pending = deque()
+        messaged = set()
+        current_recipient = 0
+        verification = None
+
+        with ThreadPoolExecutor(max_workers=self.prefetch_depth, thread_name_prefix='send-prefetch') as executor:
+            def fill():
+                while len(pending) < self.prefetch_depth:
+                    recipient = next(recipients, None)
+                    if recipient is None:
+                        return
+                    pending.append(executor.submit(self.prepare, recipient, plan))
+
+            fill()
+            while pending:
+                future = pending.popleft()
+                fill()
+                prepared = future.result()
+                volunteer_id = prepared.volunteer_id
+
+                if prepared.reason or volunteer_id in messaged:
+                    print(f"Cannot send message to volunteer with id {volunteer_id}: "
+                          f"{prepared.reason or 'already messaged'}")
+                else:
+                    # The preparation of the next recipients goes on while waiting
+                    RateLimiter().acquire(MESSAGE)
+                    messaged.add(volunteer_id)
+                    if self.submit(prepared):
+                        with self.lock:
+                            self.unverified[volunteer_id] = 0
+                            batch_full = len(self.unverified) >= self.verify_batch
+                        if batch_full and (verification is None or verification.done()):
+                            verification = executor.submit(self.verify)
+
+                current_recipient += 1
+                notifier.notify_progress_message_sending(current_recipient)
+
+            if verification is not None:
+                verification.result()
+        # The last messages are looked for until they were missed verify_attempts times
+        while self.unverified:
+            self.verify()
+        return len(messaged)
+
+    def prepare(self, volunteer_id: str, plan: Optional[CampaignPlan] = None) -> PreparedMessage:
+        """
+        Run the eligibility, profile resolution and form fetch stages for a recipient.
+
+        :return: The prepared message, with the reason it cannot be sent if a stage rejected it.
+        """
+        try:
+            recipient_plan = plan or self.campaign_planner.plan_campaign([volunteer_id])
+            if not recipient_plan.is_sendable(volunteer_id):
+                return PreparedMessage(volunteer_id, recipient_plan.get_reason(volunteer_id) or 'not planned')
+
+            # A profile resolved before is checked without loading the page
+            profile_id = ProfileIdCache().get_cached(PROFILE_ID, [volunteer_id]).get(volunteer_id)
+            if self.blacklist_service.check_if_was_blacklisted(profile_id):
+                return PreparedMessage(volunteer_id, 'blacklisted', profile_id)
+
+            # One load of the offer page gives both the profile id and the message form
+            offer_page = self.messaging_service.fetch_offer_page(volunteer_id)
+            if offer_page is None:
+                return PreparedMessage(volunteer_id, 'message form not available', profile_id)
+            profile_id = offer_page.profile_id or profile_id
+            if self.blacklist_service.check_if_was_blacklisted(profile_id):
+                return PreparedMessage(volunteer_id, 'blacklisted', profile_id)
+            return PreparedMessage(volunteer_id, None, profile_id, offer_page.form)
+        except Exception as e:
+            logging.error(f'Error while preparing the message to volunteer with id {volunteer_id}: {e}')
+            return PreparedMessage(volunteer_id, f'error while preparing: {e}')
+
+    def submit(self, prepared: PreparedMessage) -> bool:
+        """
+        Submit a prepared message, after checking the blacklist again and fetching the form again if it went stale.
+
+        :return: True if the site accepted the message, False otherwise.
+        """
+        volunteer_id = prepared.volunteer_id
+        if self.blacklist_service.check_if_was_blacklisted(prepared.profile_id):
+            print(f"Volunteer with id {prepared.profile_id} was blacklisted")
+            return False
+        if time.monotonic() - prepared.prepared_at > self.form_max_age:
+            offer_page = self.messaging_service.fetch_offer_page(volunteer_id)
+            if offer_page is None:
+                return False
+            prepared.form = offer_page.form
+            prepared.prepared_at = time.monotonic()
+        print(f"Sending message to volunteer with id {volunteer_id}")
+        return self.messaging_service.submit_message(volunteer_id, prepared.form)
+
+    def verify(self) -> Set[str]:
+        """
+        Look for the submitted messages not confirmed yet in the inbox, record the contact dates of the ones found
+        and report the ones missed verify_attempts times.
+
+        :return: The volunteer ids whose message was confirmed.
+        """
+        # The site can take a moment to list a message in the inbox
+        time.sleep(self.verify_delay)
+        with self.lock:
+            volunteer_ids = list(self.unverified)
+        try:
+            confirmed = self.messaging_service.verify_sent(volunteer_ids)
+            ContactsStore().record_contacts(volunteer_id for volunteer_id in volunteer_ids
+                                            if volunteer_id in confirmed)
+        except Exception as e:
+            logging.error(f'Error while verifying the messages sent: {e}')
+            confirmed = set()
+
+        failed = []
+        with self.lock:
+            for volunteer_id in volunteer_ids:
+                if volunteer_id in confirmed:
+                    del self.unverified[volunteer_id]
+                else:
+                    self.unverified[volunteer_id] += 1
+                    if self.unverified[volunteer_id] >= self.verify_attempts:
+                        del self.unverified[volunteer_id]
+                        failed.append(volunteer_id)
+        if confirmed:
+            print(f"Messages to {', '.join(sorted(confirmed))} were found in messages page")
+        if failed:
+            logging.error(f"Could not find the messages sent to the volunteers with ids {', '.join(failed)}")
+            print(f"Failed to send message to {', '.join(failed)}")
+            for volunteer_id in failed:
+                self.messaging_service.notifier.notify_message_not_sent(volunteer_id)
+        return confirmed
@@ -1,14 +1,20 @@
-import threading
+import logging
 import time
 from typing import List, Optional
 
+from config.settings import upload_flush_timeout
 from controllers.logincontroller import LoginController
+from models.reminderledger import ReminderLedger
 from services.blacklistservice import BlacklistService
+from services.campaignplanner import CampaignPlanner
+from services.locationautocompleteengine import LocationAutocompleteEngine
 from services.locationautocompleteservice import LocationAutocompleteService
 from services.messagingservice import MessagingService
 from services.reminderservice import ReminderService
 from services.servicemanagerinterface import ServiceManagerInterface
+from services.taskscheduler import TaskScheduler
 from services.volunteerservice import VolunteerService
+from storage.storagemanager import StorageManager
 
 
 class ServiceManager(ServiceManagerInterface):
@@ -20,12 +26,20 @@ class ServiceManager(ServiceManagerInterface):
         """
         Constructor.
         """
+        self.task_scheduler = TaskScheduler()
         self.volunteer_service = VolunteerService()
         self.__observers = []
         self.location_autocomplete_service = LocationAutocompleteService()
+        self.location_autocomplete_engine = LocationAutocompleteEngine(
+            self.location_autocomplete_service.get_location_autocomplete,
+            lambda function, *args: self.task_scheduler.submit(TaskScheduler.INTERACTIVE, function, *args,
+                                                               name='location autocomplete'))
         self.messaging_service = MessagingService()
         self.reminder_service = ReminderService()
         self.blacklist_service = BlacklistService()
+        self.campaign_planner = CampaignPlanner()
+        # Google Drive is set up in the background, the local storage is opened after it without holding up the UI
+        self.task_scheduler.submit(TaskScheduler.BULK, StorageManager.get_storage, name='open storage')
 
     def subscribe(self, observer):
         """
@@ -49,30 +63,34 @@ class ServiceManager(ServiceManagerInterface):
 
     def get_location_data(self, location):
         """
-        Get the location data by using the LocationAutocompleteService.
+        Get the location data by using the LocationAutocompleteEngine, which debounces the lookups and only
+        notifies the answer to the latest one.
         """
-        threading.Thread(target=self.__get_location_data_in_thread, args=(location,)).start()
-
-    def __get_location_data_in_thread(self, location):
-        """
-        This private method is used to get the location data in a separate thread.
-        """
-        data = self.location_autocomplete_service.get_location_autocomplete(location)
-        self.notify_location_auto_complete(data)
+        self.location_autocomplete_engine.request(location, self.notify_location_auto_complete)
 
     def get_amount_of_volunteer(self, checkbox_vars, location_ids_types, location, distance):
         """
         Get the amount of volunteers by using the VolunteerService.
         """
-        threading.Thread(target=self.__get_amount_of_volunteer_in_thread,
-                         args=(checkbox_vars, location_ids_types, location, distance)).start()
+        return self.task_scheduler.submit(TaskScheduler.INTERACTIVE, self.__get_amount_of_volunteer_in_thread,
+                                          checkbox_vars, location_ids_types, location, distance,
+                                          name='amount of volunteers')
 
     def get_volunteers(self, checkbox_vars, location_ids_types, location, distance):
         """
         Get all the volunteers by using the VolunteerService.
         """
-        threading.Thread(target=self.__get_volunteers_in_thread,
-                         args=(checkbox_vars, location_ids_types, location, distance)).start()
+        return self.task_scheduler.submit(TaskScheduler.BULK, self.__get_volunteers_in_thread,
+                                          checkbox_vars, location_ids_types, location, distance,
+                                          name='volunteers crawl')
+
+    def get_new_volunteers(self, checkbox_vars, location_ids_types, location, distance):
+        """
+        Get the volunteers found since the same search was last crawled by using the VolunteerService.
+        """
+        return self.task_scheduler.submit(TaskScheduler.BULK, self.__get_new_volunteers_in_thread,
+                                          checkbox_vars, location_ids_types, location, distance,
+                                          name='new volunteers crawl')
 
     def __get_amount_of_volunteer_in_thread(self, checkbox_vars, location_ids_types, location, distance):
         """
@@ -93,15 +111,25 @@ class ServiceManager(ServiceManagerInterface):
         """
         This private method is used to get all the volunteers in a separate thread.
         """
-        data = self.volunteer_service.get_volunteers(self, checkbox_vars, location_ids_types, location, distance)
+        data = self.volunteer_service.get_volunteers_parallel(self, checkbox_vars, location_ids_types, location,
+                                                              distance)
         self.notify_get_volunteers(data)
 
+    def __get_new_volunteers_in_thread(self, checkbox_vars, location_ids_types, location, distance):
+        """
+        This private method is used to get the new volunteers in a separate thread.
+        """
+        new_ids, _ = self.volunteer_service.get_volunteers_delta(self, checkbox_vars, location_ids_types, location,
+                                                                 distance)
+        self.notify_get_volunteers(new_ids)
+
     def send_messages(self, username: str, password: str, message: str, phoneNumber: str, recipients: List[str]):
         """
         Send a message by using the MessagingService.
         """
-        threading.Thread(target=self.__send_message_in_thread,
-                         args=(username, password, message, phoneNumber, recipients)).start()
+        return self.task_scheduler.submit(TaskScheduler.RATE_LIMITED, self.__send_message_in_thread,
+                                          username, password, message, phoneNumber, recipients,
+                                          name='send messages')
 
     def __send_message_in_thread(self, username: str, password: str, message: str, phoneNumber: str,
                                  recipients: List[str]):
@@ -110,6 +138,47 @@ class ServiceManager(ServiceManagerInterface):
         """
         self.messaging_service.send_messages(self, username, password, message, phoneNumber, recipients)
 
+    def plan_campaign(self, recipients: List[str]):
+        """
+        Check which recipients can be messaged by using the CampaignPlanner, before any message goes out.
+        """
+        return self.task_scheduler.submit(TaskScheduler.INTERACTIVE, self.__plan_campaign_in_thread, recipients,
+                                          name='plan campaign')
+
+    def __plan_campaign_in_thread(self, recipients: List[str]):
+        """
+        This private method is used to plan a campaign in a separate thread.
+        """
+        plan = self.campaign_planner.plan_campaign(recipients)
+        self.notify_campaign_plan(plan)
+        return plan
+
+    def notify_campaign_plan(self, data):
+        """
+        Notify all the subscribers about the recipients that can be messaged and the reasons the others are skipped.
+        """
+        for observer in self.__observers:
+            observer.notify('notify_campaign_plan', data)
+
+    def send_messages_to_volunteers(self, checkbox_vars, location_ids_types, location, distance, username: str,
+                                    password: str, message: str, phoneNumber: str):
+        """
+        Send a message to the volunteers of a search while the search result pages are still being loaded.
+        """
+        return self.task_scheduler.submit(TaskScheduler.RATE_LIMITED, self.__send_messages_to_volunteers_in_thread,
+                                          checkbox_vars, location_ids_types, location, distance, username,
+                                          password, message, phoneNumber, name='send messages to volunteers')
+
+    def __send_messages_to_volunteers_in_thread(self, checkbox_vars, location_ids_types, location, distance,
+                                                username: str, password: str, message: str, phoneNumber: str):
+        """
+        This private method is used to stream the volunteers into the MessagingService in a separate thread.
+        """
+        # The progress of the crawl is reported to the view while the first messages go out
+        recipients = self.volunteer_service.iter_volunteers(self, checkbox_vars, location_ids_types, location,
+                                                            distance)
+        self.messaging_service.send_messages_stream(self, username, password, message, phoneNumber, recipients)
+
     def notify_starting_messaging(self, data):
         """
         Notify all the subscribers about the starting messaging data.
@@ -163,13 +232,15 @@ class ServiceManager(ServiceManagerInterface):
         """
         Start the reminder service.
         """
-        self.reminder_service.run_reminder_service(reminder_frequency, custom_reminder_message)
+        return self.task_scheduler.submit(TaskScheduler.BULK, self.reminder_service.run_reminder_service,
+                                          reminder_frequency, custom_reminder_message, name='reminder service')
 
     def get_unanswered_chats(self, reminder_frequency):
         """
         Get all the unanswered chats by using the MessagingService.
         """
-        self.reminder_service.get_unanswered_chats(reminder_frequency)
+        return self.task_scheduler.submit(TaskScheduler.BULK, self.reminder_service.get_unanswered_chats,
+                                          reminder_frequency, name='unanswered chats')
 
     def notify_unanswered_chats(self, data):
         """
@@ -184,6 +255,26 @@ class ServiceManager(ServiceManagerInterface):
         """
         self.reminder_service.stop_reminder_service()
 
+    def get_task_stats(self) -> dict:
+        """
+        Get the queue depth and the running tasks of every lane of the TaskScheduler.
+        """
+        return self.task_scheduler.stats()
+
+    def cancel_pending_tasks(self, lane: str) -> int:
+        """
+        Cancel the tasks of a lane of the TaskScheduler that have not started yet.
+        """
+        return self.task_scheduler.cancel_lane(lane)
+
+    def shutdown(self):
+        """
+        Upload the changes not synchronised with Drive yet, before the application exits.
+        """
+        ReminderLedger().compact()
+        if not StorageManager.close(upload_flush_timeout):
+            logging.error('Not all the changes could be uploaded to Google Drive before closing')
+
     def add_to_blacklist(self, profile_id):
         self.blacklist_service.add_to_blacklist(profile_id)
 
@@ -31,9 +31,19 @@ class ServiceManagerInterface(ABC):
     def get_volunteers(self, checkbox_vars, location_ids_types, param, param1):
         pass
 
+    def get_new_volunteers(self, checkbox_vars, location_ids_types, location, distance):
+        pass
+
     def send_messages(self, username, password, param, param1, data):
         pass
 
+    def plan_campaign(self, recipients):
+        pass
+
+    def send_messages_to_volunteers(self, checkbox_vars, location_ids_types, location, distance, username, password,
+                                    message, phoneNumber):
+        pass
+
     def start_reminder_service(self, reminder_frequency: Optional[int] = None , custom_reminder_message: Optional[str] = None):
         pass
 
@@ -51,3 +61,12 @@ class ServiceManagerInterface(ABC):
         pass
     def remove_from_blacklist(self, profile_id ):
         pass
+
+    def get_task_stats(self):
+        pass
+
+    def cancel_pending_tasks(self, lane):
+        pass
+
+    def shutdown(self):
+        pass
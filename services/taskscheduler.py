@@ -0,0 +1,116 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from config.settings import scheduler_lane_workers
+
+
+class TaskScheduler:
+    """
+    Runs the background work of the application in lanes, each with its own bounded pool of workers.
+
+    - interactive: short lookups the user is waiting for, such as the location autocomplete and counts;
+    - bulk: long running crawls and reminder scans;
+    - rate_limited: message sending, which must not run concurrently.
+
+    Work in one lane never waits behind work in another, so a crawl cannot delay an autocomplete lookup.
+    """
+    INTERACTIVE = 'interactive'
+    BULK = 'bulk'
+    RATE_LIMITED = 'rate_limited'
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(TaskScheduler, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, lane_workers: Optional[Dict[str, int]] = None):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.lane_workers = dict(lane_workers or scheduler_lane_workers)
+        self.executors = {lane: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{lane}-lane')
+                          for lane, workers in self.lane_workers.items()}
+        self.lock = threading.Lock()
+        self.pending = {lane: set() for lane in self.lane_workers}
+        self.running = {lane: {} for lane in self.lane_workers}
+        self.completed = {lane: 0 for lane in self.lane_workers}
+
+    def submit(self, lane: str, function: Callable, *args, name: Optional[str] = None, **kwargs) -> Future:
+        """
+        Queue a task in a lane.
+
+        :param lane: One of TaskScheduler.INTERACTIVE, TaskScheduler.BULK or TaskScheduler.RATE_LIMITED.
+        :param function: The task, called with args and kwargs.
+        :param name: The name of the task in the stats, defaults to the name of the function.
+
+        :return: A future holding the result of the task, which can be cancelled while it is queued.
+        """
+        name = name or getattr(function, '__name__', repr(function))
+        with self.lock:
+            future = self.executors[lane].submit(self.__run, lane, name, function, *args, **kwargs)
+            self.pending[lane].add(future)
+        future.add_done_callback(lambda done: self.__on_done(lane, name, done))
+        return future
+
+    def __run(self, lane: str, name: str, function: Callable, *args, **kwargs):
+        """
+        This private method is used to keep the stats of a task while it runs on a worker of its lane.
+        """
+        thread_id = threading.get_ident()
+        with self.lock:
+            self.running[lane][thread_id] = name
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.running[lane].pop(thread_id, None)
+                self.completed[lane] += 1
+
+    def __on_done(self, lane: str, name: str, future: Future) -> None:
+        with self.lock:
+            self.pending[lane].discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f'Error in task {name}: {future.exception()}')
+
+    @staticmethod
+    def cancel(future: Future) -> bool:
+        """
+        Cancel a task that has not started yet.
+
+        :return: True if the task was cancelled, False if it is already running or done.
+        """
+        return future.cancel()
+
+    def cancel_lane(self, lane: str) -> int:
+        """
+        Cancel all the tasks of a lane that have not started yet.
+
+        :return: The amount of tasks cancelled.
+        """
+        with self.lock:
+            futures = list(self.pending[lane])
+        return sum(1 for future in futures if future.cancel())
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Get the queue depth and the running tasks of every lane.
+        """
+        with self.lock:
+            return {lane: {'workers': self.lane_workers[lane],
+                           'queued': len(self.pending[lane]) - len(self.running[lane]),
+                           'running': len(self.running[lane]),
+                           'running_tasks': list(self.running[lane].values()),
+                           'completed': self.completed[lane]}
+                    for lane in self.lane_workers}
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Cancel all queued tasks and stop the workers once the running tasks are done.
+        """
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,21 +1,33 @@
 import logging
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, List, Tuple
 
-from config.settings import headers
+from config.settings import headers, volunteers_per_page, crawl_max_workers
+from models.resultcache import ResultCache
+from models.searchhistory import SearchHistory
 from models.sessionmanager import SessionManager
 from services.UrlService import UrlService
 from bs4 import BeautifulSoup
 
+from utils.html_parser import parse_html, VOLUNTEER_COUNT
+
 
 class VolunteerService:
 
     @staticmethod
     def get_volunteers(notifier, checkbox_vars, location_ids_types, location, distance) -> list:
         url = UrlService.build_url_volunteers(checkbox_vars, location_ids_types, location, distance)
+        cached_ids = VolunteerService.__get_cached_volunteers(notifier, url)
+        if cached_ids is not None:
+            return cached_ids
+        search_url = url
         volunteers_ids = []
         current_page = 1
         try:
             response = SessionManager.get_session().get(url, headers=headers)
-            soup = BeautifulSoup(response.text, "html.parser")
+            soup = parse_html(response.text)
             key = soup.find('input', {'name': 'key'})['value']
             url = f"{url}&key={key}"
         except Exception as e:
@@ -23,26 +35,11 @@ class VolunteerService:
             return []
 
         while True:
-            page_url = f"{url}&p={current_page}&submitSearchForm=1#"
             try:
-                response = SessionManager.get_session().get(page_url, headers=headers)
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                elements = soup.find_all(['article', 'section'])
-                for element in elements:
-                    classes = set(element.get('class', []))
-                    if element.name == 'section' and {'c-results-banner', 'c-results-banner--center'}.issubset(classes):
-                        break
-
-                    if element.name == 'article' and {'c-card', 'c-card--offer', 'js-card'}.issubset(classes):
-                        anchor = element.find('a', {'class': 'c-card__anchor'})
-                        if anchor:
-                            volunteer_id = anchor.get('id')
-                            volunteers_ids.append(volunteer_id)
-
-                next_button = soup.find('a', {'rel': 'next'})
+                page_ids, has_next = VolunteerService.__get_page(url, current_page)
+                volunteers_ids.extend(page_ids)
                 notifier.notify_progresse_get_volunteers(current_page)
-                if next_button:
+                if has_next:
                     current_page += 1
                 else:
                     notifier.notify_progresse_get_volunteers(current_page)
@@ -50,12 +47,204 @@ class VolunteerService:
             except Exception as e:
                 logging.error(f'Error while getting volunteers: {e.__str__()}')
                 return []
+        ResultCache().set('ids', search_url, volunteers_ids)
         return volunteers_ids
 
+    @staticmethod
+    def get_volunteers_parallel(notifier, checkbox_vars, location_ids_types, location, distance,
+                                max_workers: int = crawl_max_workers) -> list:
+        """
+        Get all the volunteer ids, fetching the result pages through a bounded pool of workers.
+
+        The pages are fetched by iter_volunteers, the crawl the messaging streams from, so both report the same
+        progress and fill the same cache. Like every request of the shared session they are paced by the PAGE_LOAD
+        bucket of the RateLimiter, see iter_volunteers.
+
+        :param notifier: Receives notify_progresse_get_volunteers with the amount of pages fetched so far.
+        :param max_workers: The maximum amount of pages fetched at the same time.
+
+        :return: The volunteer ids in page order, without duplicates.
+        """
+        return list(VolunteerService.iter_volunteers(notifier, checkbox_vars, location_ids_types, location, distance,
+                                                     max_workers))
+
+    @staticmethod
+    def iter_volunteers(notifier, checkbox_vars, location_ids_types, location, distance,
+                        max_workers: int = crawl_max_workers) -> Iterator[str]:
+        """
+        Yield the volunteer ids page by page, as soon as each page is parsed.
+
+        At most max_workers pages are fetched ahead of the consumer, so a slow consumer such as the messaging
+        loop keeps only a few pages in memory while the crawl overlaps with it.
+
+        The pool does not make the crawl faster than the site allows: every page load takes a PAGE_LOAD token, so
+        the crawl runs at rate_limit_per_hour['page_load'] at most, after a burst of rate_limit_burst['page_load']
+        pages. More workers than that burst only wait for tokens.
+
+        :param notifier: Receives notify_progresse_get_volunteers for every page handed out, may be None.
+        :param max_workers: The maximum amount of pages fetched ahead at the same time.
+
+        :return: An iterator over the volunteer ids in page order, without duplicates.
+        """
+        url = UrlService.build_url_volunteers(checkbox_vars, location_ids_types, location, distance)
+        cached_ids = VolunteerService.__get_cached_volunteers(notifier, url)
+        if cached_ids is not None:
+            yield from cached_ids
+            return
+        search_url = url
+        try:
+            url, total_volunteers = VolunteerService.__start_search(url)
+        except Exception as e:
+            logging.error(f'Error while getting volunteers: {e.__str__()}')
+            return
+
+        total_pages = max(1, math.ceil(total_volunteers / volunteers_per_page))
+        max_workers = max(1, max_workers)
+        volunteers_ids = []
+        seen = set()
+        pending = deque()
+        next_page = 1
+        current_page = 0
+        has_next = True
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while has_next:
+                while next_page <= total_pages and len(pending) < max_workers:
+                    pending.append(executor.submit(VolunteerService.__get_page, url, next_page))
+                    next_page += 1
+                if not pending:
+                    pending.append(executor.submit(VolunteerService.__get_page, url, next_page))
+                    next_page += 1
+
+                try:
+                    page_ids, has_next = pending.popleft().result()
+                except Exception as e:
+                    logging.error(f'Error while getting volunteers: {e.__str__()}')
+                    return
+
+                current_page += 1
+                if notifier:
+                    notifier.notify_progresse_get_volunteers(current_page)
+                for volunteer_id in page_ids:
+                    if volunteer_id not in seen:
+                        seen.add(volunteer_id)
+                        volunteers_ids.append(volunteer_id)
+                        yield volunteer_id
+            ResultCache().set('ids', search_url, volunteers_ids)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def get_volunteers_delta(notifier, checkbox_vars, location_ids_types, location, distance) \
+            -> Tuple[List[str], List[str]]:
+        """
+        Get the volunteer ids found since the last time the same search was crawled.
+
+        The results are listed newest first, so the crawl stops at the first page holding only ids seen before.
+        The first crawl of a search goes through all the pages.
+
+        :param notifier: Receives notify_progresse_get_volunteers for every page fetched.
+
+        :return: The new volunteer ids, and all the volunteer ids known for the search with the new ones first.
+        """
+        url = UrlService.build_url_volunteers(checkbox_vars, location_ids_types, location, distance)
+        search_history = SearchHistory()
+        known_ids = search_history.get_seen(url)
+        known = set(known_ids)
+        new_ids = []
+        current_page = 1
+        try:
+            search_url, _ = VolunteerService.__start_search(url)
+            while True:
+                page_ids, has_next = VolunteerService.__get_page(search_url, current_page)
+                notifier.notify_progresse_get_volunteers(current_page)
+                new_on_page = [volunteer_id for volunteer_id in page_ids if volunteer_id not in known]
+                for volunteer_id in new_on_page:
+                    known.add(volunteer_id)
+                    new_ids.append(volunteer_id)
+                if not has_next or (known_ids and page_ids and not new_on_page):
+                    break
+                current_page += 1
+        except Exception as e:
+            logging.error(f'Error while getting new volunteers: {e.__str__()}')
+            return [], known_ids
+
+        search_history.add_seen(url, new_ids)
+        return new_ids, new_ids + known_ids
+
     @staticmethod
     def get_amount_of_volunteer(checkbox_vars, location_ids_types, location, distance) -> str:
         url = UrlService.build_url_volunteers(checkbox_vars, location_ids_types, location, distance)
+        total_volunteers = ResultCache().get('count', url)
+        if total_volunteers is not None:
+            return total_volunteers
         response = SessionManager.get_session().get(url, headers=headers)
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = parse_html(response.text, VOLUNTEER_COUNT)
         total_volunteers = soup.find('span', {'class': 'c-brush-underline__text'}).text
+        ResultCache().set('count', url, total_volunteers)
         return total_volunteers
+
+    @staticmethod
+    def __get_cached_volunteers(notifier, url: str) -> Optional[list]:
+        """
+        Get the volunteer ids of an earlier crawl of the same search, reporting the crawl as complete.
+
+        :param url: The search url.
+
+        :return: The cached volunteer ids, or None if the search has to be crawled.
+        """
+        volunteers_ids = ResultCache().get('ids', url)
+        if volunteers_ids is not None and notifier:
+            notifier.notify_progresse_get_volunteers(max(1, math.ceil(len(volunteers_ids) / volunteers_per_page)))
+        return volunteers_ids
+
+    @staticmethod
+    def __start_search(url: str) -> (str, int):
+        """
+        Open a search to get its key and the total amount of volunteers found.
+
+        :param url: The search url.
+
+        :return: The search url including the key, and the total amount of volunteers.
+        """
+        response = SessionManager.get_session().get(url, headers=headers)
+        soup = parse_html(response.text)
+        key = soup.find('input', {'name': 'key'})['value']
+        total_volunteers = VolunteerService.__parse_amount_of_volunteer(soup)
+        return f"{url}&key={key}", total_volunteers
+
+    @staticmethod
+    def __parse_amount_of_volunteer(soup: BeautifulSoup) -> int:
+        total_volunteers = soup.find('span', {'class': 'c-brush-underline__text'}).text
+        return int(total_volunteers.strip().replace('.', ''))
+
+    @staticmethod
+    def __get_page(url: str, page: int) -> (list, bool):
+        """
+        Get the volunteer ids listed on one result page.
+
+        :param url: The search url, including the key.
+        :param page: The number of the page.
+
+        :return: The volunteer ids on the page and whether the page links to a next page.
+        """
+        page_url = f"{url}&p={page}&submitSearchForm=1#"
+        response = SessionManager.get_session().get(page_url, headers=headers)
+        soup = parse_html(response.text)
+
+        volunteers_ids = []
+        elements = soup.find_all(['article', 'section'])
+        for element in elements:
+            classes = set(element.get('class', []))
+            if element.name == 'section' and {'c-results-banner', 'c-results-banner--center'}.issubset(classes):
+                break
+
+            if element.name == 'article' and {'c-card', 'c-card--offer', 'js-card'}.issubset(classes):
+                anchor = element.find('a', {'class': 'c-card__anchor'})
+                if anchor:
+                    volunteers_ids.append(anchor.get('id'))
+
+        next_button = soup.find('a', {'rel': 'next'})
+        return volunteers_ids, next_button is not None
@@ -0,0 +1,155 @@
+import csv
+import io
+import logging
+import threading
+from typing import List, Optional
+
+from google_drive.google_api_services import GoogleDriveManager
+from google_drive.uploadqueue import UploadQueue
+from storage.storageinterface import StorageInterface, TABLES
+
+# How often a push is retried at once after the file changed on Drive, before leaving it to the upload queue
+PUSH_ATTEMPTS = 3
+
+
+class DriveSync:
+    """
+    Keeps the files in the Drive data folder in sync with the local storage.
+
+    At start the files are pulled from Drive in the background and merged into the storage. After that the changes
+    feed of Drive is polled every poll_interval seconds, and only the files other clients changed are downloaded and
+    merged. Local changes are pushed in the background: a table changed several times within push_delay seconds is
+    uploaded once, and a failed upload is retried after retry_delay seconds. Changes that were not pushed before the
+    application closed are pushed after the next pull.
+    """
+
+    def __init__(self, storage: StorageInterface, drive_manager: GoogleDriveManager, push_delay: float,
+                 retry_delay: float, poll_interval: float):
+        self.storage = storage
+        self.drive_manager = drive_manager
+        self.poll_interval = poll_interval
+        self.pulled = threading.Event()
+        self.closed = threading.Event()
+        self.upload_queue = UploadQueue(self.__push, push_delay, retry_delay)
+        storage.subscribe(self.__on_change)
+        drive_manager.subscribe_changes(self.__on_remote_change)
+
+    def start(self) -> None:
+        """
+        Pull all the files on a background thread, then keep polling the changes feed on it.
+        """
+        threading.Thread(target=self.__run, name='drive-sync', daemon=True).start()
+
+    def __run(self) -> None:
+        try:
+            # The feed is started first, so the changes made during the pull are not missed
+            self.drive_manager.start_changes()
+        except Exception as e:
+            logging.error(f'Error while following the changes of Google Drive: {e}')
+        self.pull_all()
+        while not self.closed.wait(self.poll_interval):
+            self.poll()
+
+    def pull_all(self) -> None:
+        try:
+            for table in TABLES:
+                self.pull(table)
+        finally:
+            self.pulled.set()
+
+    def poll(self) -> List[str]:
+        """
+        Merge the files changed on Drive since the last poll into the storage.
+
+        :return: The tables that changed.
+        """
+        try:
+            file_names = self.drive_manager.get_changes()
+        except Exception as e:
+            logging.error(f'Error while getting the changes from Google Drive: {e}')
+            return []
+        return [table for table, file_name in TABLES.items() if file_name in file_names]
+
+    def pull(self, table: str) -> bool:
+        """
+        Merge the file of a table into the storage, then push the local changes it did not have yet.
+
+        :return: True if the file could be read, False otherwise.
+        """
+        file_name = TABLES[table]
+        try:
+            file_id = self.drive_manager.find_file_id_by_name(file_name)
+            file_content = self.drive_manager.download_file_content(file_id) if file_id else b''
+        except Exception as e:
+            logging.error(f'Error while pulling {file_name} from Google Drive: {e}')
+            print(f'Error while pulling {file_name} from Google Drive: {e}')
+            return False
+        self.__merge(table, file_content)
+        return True
+
+    def __merge(self, table: str, file_content: bytes) -> None:
+        """
+        This private method is used to merge the content of a file into its table, queueing a push of the local
+        changes the file did not have yet.
+        """
+        rows = list(csv.reader(io.StringIO(file_content.decode('utf-8'))))
+        if self.storage.merge_remote(table, rows):
+            self.upload_queue.enqueue(table, TABLES[table])
+
+    def wait_until_pulled(self, timeout: Optional[float] = None) -> bool:
+        """
+        :return: True once all the files were pulled, False if the timeout expired first.
+        """
+        return self.pulled.wait(timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Push the pending changes now, blocking until they are uploaded.
+
+        :return: True if all the changes were pushed, False if the timeout expired first.
+        """
+        return self.upload_queue.flush(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        self.closed.set()
+        return self.upload_queue.close(timeout)
+
+    def __on_change(self, table: str, remote: bool) -> None:
+        if not remote:
+            self.upload_queue.enqueue(table, TABLES[table])
+
+    def __on_remote_change(self, file_name: str, file_content: bytes) -> None:
+        table = next((table for table, table_file_name in TABLES.items() if table_file_name == file_name), None)
+        if table:
+            self.__merge(table, file_content)
+
+    def __push(self, table: str, file_name: str) -> None:
+        """
+        This private method is used to upload the current rows of a table, called by the upload queue.
+
+        The upload only goes through if the file did not change on Drive since it was last read. Otherwise the file is
+        pulled again, which merges the rows changed on Drive with the local changes row by row, and the merged rows
+        are uploaded. A file on Drive this process has not read yet, e.g. after a failed pull or when another client
+        created it, is pulled before the first upload.
+        """
+        with self.drive_manager.get_file_lock(file_name):
+            for _ in range(PUSH_ATTEMPTS):
+                version, synced_version, _ = self.storage.get_changes(table)
+                if version <= synced_version:
+                    return
+                revision = self.drive_manager.get_known_revision(file_name)
+                if revision is None and self.drive_manager.find_file_id_by_name(file_name):
+                    if not self.pull(table):
+                        break
+                    revision = self.drive_manager.get_known_revision(file_name)
+                with io.StringIO() as file_content:
+                    csv.writer(file_content).writerows(self.storage.all(table))
+                    response = self.drive_manager.upload_file_content_if_unchanged(
+                        file_content.getvalue().encode('utf-8'), file_name, revision)
+                if response is not None:
+                    self.storage.mark_synced(table, version)
+                    return
+                logging.info(f'{file_name} changed on Google Drive, merging the changes before uploading again')
+                if not self.pull(table):
+                    break
+        raise RuntimeError(f'Could not upload {file_name} to Google Drive')
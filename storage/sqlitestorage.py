@@ -0,0 +1,330 @@
+import json
+import logging
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from storage.storageinterface import StorageInterface, TABLES
+
+
+class SQLiteStorage(StorageInterface):
+    """
+    Local storage of the data files, one indexed SQLite table per file, in WAL mode so reads do not wait for writes.
+
+    Every local change raises the version of its table, and the keys it stored or deleted are kept until the change
+    was synchronised, so a DriveSync can tell what still has to be pushed, also after a restart.
+
+    Next to its rows, a table has an append-only ledger of rows that are not part of the table yet. Appending is a
+    single insert that does not touch the table, compact folds the ledger into the table as one change.
+    """
+
+    def __init__(self, path: str):
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            for table in TABLES:
+                self.connection.execute(f'CREATE TABLE IF NOT EXISTS {table} ('
+                                        'key TEXT PRIMARY KEY, position INTEGER NOT NULL, row TEXT NOT NULL)')
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS {table}_position ON {table} (position)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS sync_state ('
+                                    'table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0, '
+                                    'synced_version INTEGER NOT NULL DEFAULT 0, pulled INTEGER NOT NULL DEFAULT 0)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS deleted_keys ('
+                                    'table_name TEXT NOT NULL, key TEXT NOT NULL, version INTEGER NOT NULL, '
+                                    'PRIMARY KEY (table_name, key))')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS dirty_keys ('
+                                    'table_name TEXT NOT NULL, key TEXT NOT NULL, version INTEGER NOT NULL, '
+                                    'PRIMARY KEY (table_name, key))')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS ledger ('
+                                    'sequence INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, '
+                                    'row TEXT NOT NULL)')
+            self.connection.executemany('INSERT OR IGNORE INTO sync_state (table_name) VALUES (?)',
+                                        [(table,) for table in TABLES])
+
+    @staticmethod
+    def __check_table(table: str) -> None:
+        if table not in TABLES:
+            raise ValueError(f'Unknown table: {table}')
+
+    def get(self, table: str, key: str) -> Optional[List[str]]:
+        """
+        :return: The row with the key, or None if there is none.
+        """
+        self.__check_table(table)
+        with self.lock:
+            row = self.connection.execute(f'SELECT row FROM {table} WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, table: str, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        :return: The rows found for the keys, by key.
+        """
+        self.__check_table(table)
+        keys = list(dict.fromkeys(keys))
+        rows = {}
+        with self.lock:
+            # SQLite limits the amount of parameters of a statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                for key, row in self.connection.execute(f'SELECT key, row FROM {table} WHERE key IN ({placeholders})',
+                                                        chunk):
+                    rows[key] = json.loads(row)
+        return rows
+
+    def all(self, table: str) -> List[List[str]]:
+        """
+        :return: All the rows, in the order they were first stored.
+        """
+        self.__check_table(table)
+        with self.lock:
+            rows = self.connection.execute(f'SELECT row FROM {table} ORDER BY position').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def put(self, table: str, rows: Iterable[List[str]]) -> None:
+        """
+        Store rows, replacing the rows with the same key. New keys are added at the end.
+        """
+        self.__check_table(table)
+        rows = [[str(value) for value in row] for row in rows if row]
+        if not rows:
+            return
+        with self.lock, self.connection:
+            self.__upsert(table, rows)
+        self.__notify(table, False)
+
+    def __upsert(self, table: str, rows: List[List[str]]) -> None:
+        """
+        This private method is used to store rows as a local change, called inside a transaction.
+        """
+        position = self.connection.execute(f'SELECT COALESCE(MAX(position), 0) FROM {table}').fetchone()[0]
+        for row in rows:
+            position += 1
+            self.connection.execute(f'INSERT INTO {table} (key, position, row) VALUES (?, ?, ?) '
+                                    'ON CONFLICT (key) DO UPDATE SET row = excluded.row',
+                                    (row[0], position, json.dumps(row)))
+        version = self.__bump_version(table)
+        self.connection.executemany('DELETE FROM deleted_keys WHERE table_name = ? AND key = ?',
+                                    [(table, row[0]) for row in rows])
+        self.__mark_dirty(table, [row[0] for row in rows], version)
+
+    def delete(self, table: str, keys: Iterable[str]) -> None:
+        """
+        Delete the rows with the keys.
+        """
+        self.__check_table(table)
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        with self.lock, self.connection:
+            version = self.__bump_version(table)
+            self.connection.executemany(f'DELETE FROM {table} WHERE key = ?', [(key,) for key in keys])
+            self.connection.executemany('INSERT OR REPLACE INTO deleted_keys (table_name, key, version) '
+                                        'VALUES (?, ?, ?)', [(table, key, version) for key in keys])
+            self.connection.executemany('DELETE FROM dirty_keys WHERE table_name = ? AND key = ?',
+                                        [(table, key) for key in keys])
+        self.__notify(table, False)
+
+    def replace(self, table: str, rows: Iterable[List[str]]) -> None:
+        """
+        Replace all the rows of a table.
+        """
+        self.__check_table(table)
+        rows = [[str(value) for value in row] for row in rows if row]
+        with self.lock, self.connection:
+            keys = {row[0] for row in rows}
+            removed = [key for key, in self.connection.execute(f'SELECT key FROM {table}') if key not in keys]
+            self.connection.execute(f'DELETE FROM {table}')
+            self.__insert(table, rows)
+            version = self.__bump_version(table)
+            self.connection.executemany('INSERT OR REPLACE INTO deleted_keys (table_name, key, version) '
+                                        'VALUES (?, ?, ?)', [(table, key, version) for key in removed])
+            self.connection.executemany('DELETE FROM dirty_keys WHERE table_name = ? AND key = ?',
+                                        [(table, key) for key in removed])
+            self.__mark_dirty(table, keys, version)
+        self.__notify(table, False)
+
+    def append(self, table: str, row: List[str]) -> None:
+        """
+        Append a row to the ledger of a table. The table itself does not change until the ledger is compacted.
+        """
+        self.__check_table(table)
+        if not row:
+            return
+        with self.lock, self.connection:
+            self.connection.execute('INSERT INTO ledger (table_name, row) VALUES (?, ?)',
+                                    (table, json.dumps([str(value) for value in row])))
+
+    def get_ledger(self, table: str) -> List[List[str]]:
+        """
+        :return: The rows in the ledger of a table, in the order they were appended.
+        """
+        self.__check_table(table)
+        with self.lock:
+            rows = self.connection.execute('SELECT row FROM ledger WHERE table_name = ? ORDER BY sequence',
+                                           (table,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def compact(self, table: str) -> int:
+        """
+        Fold the ledger of a table into the table and empty it. Of the rows with the same key the last one appended
+        is stored, as one change of the table.
+
+        :return: The amount of rows that were folded.
+        """
+        self.__check_table(table)
+        with self.lock, self.connection:
+            ledger = self.connection.execute('SELECT sequence, row FROM ledger WHERE table_name = ? ORDER BY sequence',
+                                             (table,)).fetchall()
+            if not ledger:
+                return 0
+            rows = {}
+            for _, row in ledger:
+                row = json.loads(row)
+                rows[row[0]] = row
+            self.__upsert(table, list(rows.values()))
+            self.connection.execute('DELETE FROM ledger WHERE table_name = ? AND sequence <= ?',
+                                    (table, ledger[-1][0]))
+        self.__notify(table, False)
+        return len(ledger)
+
+    def merge_remote(self, table: str, rows: Iterable[List[str]]) -> bool:
+        """
+        Load the rows of a table as found on Drive. Local changes that were not synchronised yet win: the rows stored
+        locally since replace the remote rows with the same key and the keys deleted locally stay deleted. The other
+        rows are taken from Drive, so the changes of another client to them are kept.
+
+        :return: True if local changes remain to be synchronised, False if the table now equals the remote rows.
+        """
+        self.__check_table(table)
+        rows = [[str(value) for value in row] for row in rows if row]
+        if table == 'reminders':
+            rows = self.fold_reminders(rows)
+        with self.lock, self.connection:
+            version, synced_version = self.connection.execute(
+                'SELECT version, synced_version FROM sync_state WHERE table_name = ?', (table,)).fetchone()
+            changed = version > synced_version
+            if changed:
+                local_rows = {key: json.loads(row) for key, row in self.connection.execute(
+                    f'SELECT key, row FROM {table} WHERE key IN '
+                    '(SELECT key FROM dirty_keys WHERE table_name = ? AND version > ?)', (table, synced_version))}
+                deleted_keys = {row[0] for row in self.connection.execute(
+                    'SELECT key FROM deleted_keys WHERE table_name = ? AND version > ?', (table, synced_version))}
+                merged = {}
+                for row in rows:
+                    if row[0] not in deleted_keys:
+                        merged.setdefault(row[0], local_rows.pop(row[0], row))
+                merged.update(local_rows)
+                rows = list(merged.values())
+            self.connection.execute(f'DELETE FROM {table}')
+            self.__insert(table, rows)
+            self.connection.execute('UPDATE sync_state SET pulled = 1 WHERE table_name = ?', (table,))
+        self.__notify(table, True)
+        return changed
+
+    @staticmethod
+    def fold_reminders(rows: List[List[str]]) -> List[List[str]]:
+        """
+        Fold the rows of a chat in chats_no_response.csv into one. Before the ban date had a column of its own, a chat
+        starting a new round of reminders got a row with counter 0 next to the row with counter 5 marking the ban.
+
+        :return: One [chat url, date, counter, banned_at] row per chat, at the place of its first row. The round is
+                 the latest row with a counter up to 4, banned_at the latest ban of the chat. A chat with only a ban
+                 row is left at the end of a round, with counter 4.
+        """
+        # chat url -> [round row, latest ban, first malformed row], in the order of the first rows
+        folded = {}
+        for row in rows:
+            entry = folded.setdefault(row[0], [None, '', None])
+            if len(row) < 3 or not row[2].isdigit():
+                entry[2] = entry[2] or row
+                continue
+            date, counter = row[1], int(row[2])
+            if counter <= 4 and (entry[0] is None or date >= entry[0][1]):
+                entry[0] = [row[0], date, row[2]]
+            banned_at = row[3] if len(row) > 3 and row[3] else (date if counter > 4 else '')
+            entry[1] = max(entry[1], banned_at)
+
+        result = []
+        for chat_url, (round_row, banned_at, malformed_row) in folded.items():
+            if round_row is None and not banned_at:
+                result.append(malformed_row)
+                continue
+            row = round_row or [chat_url, banned_at, '4']
+            result.append(row + [banned_at] if banned_at else row)
+        return result
+
+    def __insert(self, table: str, rows: List[List[str]]) -> None:
+        """
+        This private method is used to insert rows into an emptied table, called inside a transaction. Of rows with
+        the same key the first one is kept, as it is the one a scan of the file would find.
+        """
+        self.connection.executemany(f'INSERT OR IGNORE INTO {table} (key, position, row) VALUES (?, ?, ?)',
+                                    [(row[0], position, json.dumps(row)) for position, row in enumerate(rows)])
+
+    def __mark_dirty(self, table: str, keys: Iterable[str], version: int) -> None:
+        """
+        This private method is used to record the keys stored by a local change, called inside its transaction.
+        """
+        self.connection.executemany('INSERT OR REPLACE INTO dirty_keys (table_name, key, version) VALUES (?, ?, ?)',
+                                    [(table, key, version) for key in keys])
+
+    def __bump_version(self, table: str) -> int:
+        """
+        This private method is used to record a local change of a table, called inside the transaction of the change.
+        """
+        self.connection.execute('UPDATE sync_state SET version = version + 1 WHERE table_name = ?', (table,))
+        return self.connection.execute('SELECT version FROM sync_state WHERE table_name = ?', (table,)).fetchone()[0]
+
+    def subscribe(self, listener: Callable[[str, bool], None]) -> None:
+        """
+        :param listener: Called as listener(table, remote) after every change of a table.
+        """
+        with self.lock:
+            self.listeners.append(listener)
+
+    def __notify(self, table: str, remote: bool) -> None:
+        for listener in list(self.listeners):
+            try:
+                listener(table, remote)
+            except Exception as e:
+                logging.error(f'Error while notifying a change of {table}: {e}')
+
+    def get_changes(self, table: str) -> (int, int, List[str]):
+        """
+        :return: The version of the table, the version last synchronised, and the keys deleted since.
+        """
+        self.__check_table(table)
+        with self.lock:
+            version, synced_version = self.connection.execute(
+                'SELECT version, synced_version FROM sync_state WHERE table_name = ?', (table,)).fetchone()
+            deleted_keys = [row[0] for row in self.connection.execute(
+                'SELECT key FROM deleted_keys WHERE table_name = ? AND version > ?', (table, synced_version))]
+        return version, synced_version, deleted_keys
+
+    def mark_synced(self, table: str, version: int) -> None:
+        """
+        Record that the table was synchronised up to a version.
+        """
+        self.__check_table(table)
+        with self.lock, self.connection:
+            self.connection.execute('UPDATE sync_state SET synced_version = MAX(synced_version, ?) '
+                                    'WHERE table_name = ?', (version, table))
+            self.connection.execute('DELETE FROM deleted_keys WHERE table_name = ? AND version <= ?', (table, version))
+            self.connection.execute('DELETE FROM dirty_keys WHERE table_name = ? AND version <= ?', (table, version))
+
+    def was_pulled(self, table: str) -> bool:
+        """
+        :return: True if the table was loaded from Drive at least once.
+        """
+        self.__check_table(table)
+        with self.lock:
+            return bool(self.connection.execute('SELECT pulled FROM sync_state WHERE table_name = ?',
+                                                (table,)).fetchone()[0])
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,74 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional
+
+# The tables of the storage and the files in the Drive data folder they are synchronised with. Every table holds
+# the rows of its file, keyed by the first column.
+TABLES = {
+    'contacts': 'contacts_date.csv',
+    'reminder_settings': 'reminder_data.csv',
+    'reminders': 'chats_no_response.csv',
+    'blacklist': 'blacklisted_volunteers.csv',
+}
+
+
+class StorageInterface(ABC):
+
+    @abstractmethod
+    def get(self, table: str, key: str) -> Optional[List[str]]:
+        pass
+
+    @abstractmethod
+    def get_many(self, table: str, keys: Iterable[str]) -> Dict[str, List[str]]:
+        pass
+
+    @abstractmethod
+    def all(self, table: str) -> List[List[str]]:
+        pass
+
+    @abstractmethod
+    def put(self, table: str, rows: Iterable[List[str]]) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, table: str, keys: Iterable[str]) -> None:
+        pass
+
+    @abstractmethod
+    def replace(self, table: str, rows: Iterable[List[str]]) -> None:
+        pass
+
+    @abstractmethod
+    def append(self, table: str, row: List[str]) -> None:
+        pass
+
+    @abstractmethod
+    def get_ledger(self, table: str) -> List[List[str]]:
+        pass
+
+    @abstractmethod
+    def compact(self, table: str) -> int:
+        pass
+
+    @abstractmethod
+    def merge_remote(self, table: str, rows: Iterable[List[str]]) -> bool:
+        pass
+
+    @abstractmethod
+    def subscribe(self, listener: Callable[[str, bool], None]) -> None:
+        pass
+
+    @abstractmethod
+    def get_changes(self, table: str) -> (int, int, List[str]):
+        pass
+
+    @abstractmethod
+    def mark_synced(self, table: str, version: int) -> None:
+        pass
+
+    @abstractmethod
+    def was_pulled(self, table: str) -> bool:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
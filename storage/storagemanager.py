@@ -0,0 +1,62 @@
+import logging
+import threading
+from typing import Optional
+
+from config.settings import storage_path, storage_push_delay, storage_pull_timeout, storage_poll_interval, \
+    upload_retry_delay
+from google_drive.google_api_services import GoogleDriveManager
+from storage.drivesync import DriveSync
+from storage.sqlitestorage import SQLiteStorage
+from storage.storageinterface import StorageInterface, TABLES
+
+
+class StorageManager:
+    _storage = None
+    _sync = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_storage() -> StorageInterface:
+        """
+        Get the local storage, opening it on first use and starting its synchronisation with Drive.
+
+        The first time the application runs the storage is empty, so the first use then waits up to
+        storage_pull_timeout seconds for the files to be pulled. Otherwise the local data is used right away.
+        """
+        if StorageManager._storage is None:
+            StorageManager.configure(storage_path)
+        return StorageManager._storage
+
+    @staticmethod
+    def configure(path: str, drive_manager: Optional[GoogleDriveManager] = None) -> StorageInterface:
+        """
+        Open the storage at a path, synchronised through a GoogleDriveManager.
+        """
+        with StorageManager._lock:
+            if StorageManager._storage is None:
+                storage = SQLiteStorage(path)
+                sync = DriveSync(storage, drive_manager or GoogleDriveManager(), storage_push_delay,
+                                 upload_retry_delay, storage_poll_interval)
+                sync.start()
+                if not all(storage.was_pulled(table) for table in TABLES) \
+                        and not sync.wait_until_pulled(storage_pull_timeout):
+                    logging.error('Google Drive did not answer in time, continuing with the local data')
+                StorageManager._sync = sync
+                StorageManager._storage = storage
+        return StorageManager._storage
+
+    @staticmethod
+    def get_sync() -> DriveSync:
+        StorageManager.get_storage()
+        return StorageManager._sync
+
+    @staticmethod
+    def close(timeout: Optional[float] = None) -> bool:
+        """
+        Push the changes not synchronised yet to Drive.
+
+        :return: True if all the changes were pushed, False if the timeout expired first.
+        """
+        if StorageManager._sync is None:
+            return True
+        return StorageManager._sync.close(timeout)
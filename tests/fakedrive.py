@@ -0,0 +1,171 @@
+"""
+In-memory stand-in for the Drive v3 service used by GoogleDriveManager.
+
+It implements the calls the application makes, files().list/get/get_media/create/update with the query syntax
+the application uses and changes().getStartPageToken/list, and counts the calls so benchmarks can report Drive
+round trips next to page loads. The tests run on it as well.
+"""
+import hashlib
+import itertools
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+
+class FakeHttpResponse(dict):
+
+    def __init__(self, status: int, headers: dict):
+        super().__init__(headers)
+        self.status = status
+        self.reason = 'OK' if status < 400 else 'Error'
+
+
+class FakeHttp:
+    """
+    The http object MediaIoBaseDownload reads the media through.
+    """
+
+    def __init__(self, drive: 'FakeDriveService'):
+        self.drive = drive
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        file_id = uri.rsplit('/', 1)[-1]
+        content = self.drive.files_by_id[file_id]['content']
+        return FakeHttpResponse(200, {'content-length': str(len(content))}), content
+
+
+class FakeRequest:
+
+    def __init__(self, drive: 'FakeDriveService', method: str, function, uri: str = ''):
+        self.drive = drive
+        self.method = method
+        self.function = function
+        self.uri = uri
+        self.http = FakeHttp(drive)
+        self.headers = {}
+
+    def execute(self, *args, **kwargs):
+        with self.drive.lock:
+            self.drive.calls[self.method] += 1
+            return self.function()
+
+
+class FakeFiles:
+
+    def __init__(self, drive: 'FakeDriveService'):
+        self.drive = drive
+
+    def list(self, q: str = '', spaces: Optional[str] = None, fields: Optional[str] = None, **kwargs):
+        return FakeRequest(self.drive, 'files.list', lambda: {'files': self.drive.query(q)})
+
+    def get(self, fileId: str, fields: Optional[str] = None, **kwargs):
+        return FakeRequest(self.drive, 'files.get', lambda: self.drive.metadata(fileId))
+
+    def get_media(self, fileId: str, **kwargs):
+        self.drive.calls['files.get_media'] += 1
+        return FakeRequest(self.drive, 'files.get_media', lambda: None, uri=f'fake://drive/{fileId}')
+
+    def create(self, body: dict, media_body=None, fields: Optional[str] = None, **kwargs):
+        return FakeRequest(self.drive, 'files.create', lambda: self.drive.create(body, media_body))
+
+    def update(self, fileId: str, media_body=None, body: Optional[dict] = None, fields: Optional[str] = None,
+               **kwargs):
+        return FakeRequest(self.drive, 'files.update', lambda: self.drive.update(fileId, media_body, body))
+
+
+class FakeChanges:
+
+    def __init__(self, drive: 'FakeDriveService'):
+        self.drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(self.drive, 'changes.getStartPageToken',
+                           lambda: {'startPageToken': str(len(self.drive.change_log) + 1)})
+
+    def list(self, pageToken: str, pageSize: int = 100, spaces: Optional[str] = None, fields: Optional[str] = None,
+             **kwargs):
+        return FakeRequest(self.drive, 'changes.list', lambda: self.drive.list_changes(int(pageToken), pageSize))
+
+
+class FakeDriveService:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.files_by_id = {}
+        self.calls = Counter()
+        self.uploaded_bytes = 0
+        self.ids = itertools.count(1)
+        # The ids of the changed files, in order. Page token n points at the n-th change
+        self.change_log = []
+
+    def files(self) -> FakeFiles:
+        return FakeFiles(self)
+
+    def changes(self) -> FakeChanges:
+        return FakeChanges(self)
+
+    def list_changes(self, start: int, page_size: int) -> dict:
+        end = min(start - 1 + page_size, len(self.change_log))
+        response = {'changes': [{'fileId': file_id, 'removed': False, 'file': self.metadata(file_id)}
+                                for file_id in self.change_log[start - 1:end]]}
+        if end < len(self.change_log):
+            response['nextPageToken'] = str(end + 1)
+        else:
+            response['newStartPageToken'] = str(end + 1)
+        return response
+
+    def query(self, q: str) -> list:
+        name = re.search(r"name='([^']*)'", q)
+        parent = re.search(r"'([^']*)' in parents", q)
+        mime_type = re.search(r"mimeType='([^']*)'", q)
+        return [self.metadata(file_id) for file_id, file in self.files_by_id.items()
+                if (not name or file['name'] == name.group(1))
+                and (not parent or parent.group(1) in file['parents'])
+                and (not mime_type or file['mimeType'] == mime_type.group(1))
+                and not ('trashed=false' in q.replace(' ', '') and file['trashed'])]
+
+    def metadata(self, file_id: str) -> dict:
+        file = self.files_by_id[file_id]
+        return {'id': file_id, 'name': file['name'], 'mimeType': file['mimeType'], 'parents': file['parents'],
+                'md5Checksum': hashlib.md5(file['content']).hexdigest(),
+                'headRevisionId': str(file['revision']), 'trashed': file['trashed']}
+
+    def create(self, body: dict, media_body=None) -> dict:
+        file_id = f'file{next(self.ids)}'
+        self.files_by_id[file_id] = {'name': body['name'], 'mimeType': body.get('mimeType', 'text/csv'),
+                                     'parents': list(body.get('parents', [])), 'content': b'', 'revision': 1,
+                                     'trashed': False}
+        if media_body is not None:
+            self.files_by_id[file_id]['content'] = media_body.getbytes(0, media_body.size())
+            self.uploaded_bytes += media_body.size()
+        self.change_log.append(file_id)
+        return self.metadata(file_id)
+
+    def update(self, file_id: str, media_body=None, body: Optional[dict] = None) -> dict:
+        file = self.files_by_id[file_id]
+        if body and 'name' in body:
+            file['name'] = body['name']
+        if media_body is not None:
+            file['content'] = media_body.getbytes(0, media_body.size())
+            self.uploaded_bytes += media_body.size()
+        file['revision'] += 1
+        self.change_log.append(file_id)
+        return self.metadata(file_id)
+
+    def put_file(self, name: str, content: bytes, parent: Optional[str] = None) -> str:
+        """
+        Create or replace a file directly, as another client of the same Drive would.
+        """
+        with self.lock:
+            for file_id, file in self.files_by_id.items():
+                if file['name'] == name and (parent is None or parent in file['parents']):
+                    file['content'] = content
+                    file['revision'] += 1
+                    self.change_log.append(file_id)
+                    return file_id
+            file_id = self.create({'name': name, 'parents': [parent] if parent else []})['id']
+            self.files_by_id[file_id]['content'] = content
+            return file_id
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from dateutil.relativedelta import relativedelta
+
+from tests.fakedrive import FakeDriveService
+from google_drive.google_api_services import GoogleDriveManager
+from models.blacklistindex import BlacklistIndex
+from models.contactsstore import ContactsStore
+from models.profileidcache import ProfileIdCache
+from models.reminderledger import ReminderLedger
+from services.campaignplanner import CampaignPlanner, NO_RESPONSE_BAN
+from services.reminderservice import ReminderService
+from storage.sqlitestorage import SQLiteStorage
+
+
+class ReminderBanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.directory.name, 'storage.sqlite3'))
+        for singleton in (ReminderLedger, ContactsStore, BlacklistIndex, ProfileIdCache):
+            singleton._instance = None
+        ReminderLedger(self.storage)
+        ContactsStore(self.storage)
+        BlacklistIndex(self.storage)
+        ProfileIdCache(path=os.path.join(self.directory.name, 'profile_cache.sqlite3'))
+        GoogleDriveManager(service=FakeDriveService())
+        self.volunteer_id = '123'
+        self.chat_url = f'https://www.nlvoorelkaar.nl/mijn-pagina/berichten/{self.volunteer_id}'
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def run_reminders(self):
+        reminder_service = ReminderService()
+        with mock.patch.object(reminder_service, 'send_reminder'), \
+                mock.patch.object(reminder_service, 'construct_message', return_value='Hallo'):
+            reminder_service.csv_handler([self.chat_url], 3)
+
+    def test_new_round_after_unanswered_reminders_bans_the_volunteer(self):
+        seven_months_ago = (date.today() - relativedelta(months=7)).strftime('%Y-%m-%d')
+        # The fifth reminder of the round went unanswered
+        self.storage.put('reminders', [[self.chat_url, seven_months_ago, '4']])
+
+        self.run_reminders()
+
+        row = ReminderLedger().get(self.chat_url)
+        self.assertEqual(row[2], '0')
+        plan = CampaignPlanner().plan_campaign([self.volunteer_id])
+        self.assertEqual(plan.get_reason(self.volunteer_id), NO_RESPONSE_BAN)
+
+    def test_ban_survives_the_reminders_of_the_new_round(self):
+        seven_months_ago = (date.today() - relativedelta(months=7)).strftime('%Y-%m-%d')
+        banned_at = (date.today() - relativedelta(months=1)).strftime('%Y-%m-%d')
+        self.storage.put('reminders', [[self.chat_url, seven_months_ago, '0', banned_at]])
+
+        self.run_reminders()
+
+        self.assertEqual(ReminderLedger().get(self.chat_url)[2:], ['1', banned_at])
+        self.assertTrue(CampaignPlanner.is_banned(ReminderLedger().get(self.chat_url)))
+
+    def test_ban_is_found_for_other_forms_of_the_chat_url(self):
+        banned_at = (date.today() - relativedelta(months=1)).strftime('%Y-%m-%d')
+        self.storage.put('reminders', [['https://www.nlvoorelkaar.nl/mijn-pagina/berichten/124/', banned_at, '5'],
+                                       ['https://www.nlvoorelkaar.nl/mijn-pagina/berichten/125?p=2', banned_at, '5']])
+
+        plan = CampaignPlanner().plan_campaign(['124', '125', '126'])
+
+        self.assertEqual(plan.sendable, ['126'])
+
+    def test_ban_expires_after_twelve_months(self):
+        thirteen_months_ago = (date.today() - relativedelta(months=13)).strftime('%Y-%m-%d')
+
+        self.assertFalse(CampaignPlanner.is_banned([self.chat_url, thirteen_months_ago, '0', thirteen_months_ago]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+from storage.sqlitestorage import SQLiteStorage
+
+
+class SQLiteStorageMergeRemoteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.directory.name, 'storage.sqlite3'))
+        self.storage.merge_remote('contacts', [['A', '2024-01-01'], ['B', '2024-01-01']])
+        version, _, _ = self.storage.get_changes('contacts')
+        self.storage.mark_synced('contacts', version)
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_remote_change_of_another_key_is_kept(self):
+        self.storage.put('contacts', [['C', '2025-06-01']])
+
+        changed = self.storage.merge_remote('contacts', [['A', '2024-01-01'], ['B', '2025-06-06']])
+
+        self.assertTrue(changed)
+        self.assertEqual(self.storage.get('contacts', 'B'), ['B', '2025-06-06'])
+        self.assertEqual(self.storage.get('contacts', 'C'), ['C', '2025-06-01'])
+
+    def test_local_change_of_the_same_key_wins(self):
+        self.storage.put('contacts', [['B', '2025-07-01']])
+
+        self.storage.merge_remote('contacts', [['A', '2024-01-01'], ['B', '2025-06-06']])
+
+        self.assertEqual(self.storage.get('contacts', 'B'), ['B', '2025-07-01'])
+
+    def test_row_deleted_remotely_is_not_restored(self):
+        self.storage.put('contacts', [['C', '2025-06-01']])
+
+        self.storage.merge_remote('contacts', [['B', '2024-01-01']])
+
+        self.assertIsNone(self.storage.get('contacts', 'A'))
+        self.assertEqual(self.storage.get('contacts', 'C'), ['C', '2025-06-01'])
+
+    def test_synced_changes_no_longer_override_remote(self):
+        self.storage.put('contacts', [['C', '2025-06-01']])
+        version, _, _ = self.storage.get_changes('contacts')
+        self.storage.mark_synced('contacts', version)
+
+        changed = self.storage.merge_remote('contacts', [['C', '2025-08-01']])
+
+        self.assertFalse(changed)
+        self.assertEqual(self.storage.all('contacts'), [['C', '2025-08-01']])
+
+
+class SQLiteStorageLegacyRemindersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.directory.name, 'storage.sqlite3'))
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_duplicated_chat_rows_are_folded_on_import(self):
+        chat_url = 'https://www.nlvoorelkaar.nl/mijn-pagina/berichten/123'
+        # The ban row and the new round row csv_handler wrote next to it, and a reminder of the new round
+        legacy_csv = [[chat_url, '2025-01-10', '5'],
+                      [chat_url, '2025-01-10', '0'],
+                      [chat_url, '2025-01-20', '1']]
+
+        self.storage.merge_remote('reminders', legacy_csv)
+
+        self.assertEqual(self.storage.all('reminders'), [[chat_url, '2025-01-20', '1', '2025-01-10']])
+
+    def test_new_round_row_before_the_ban_row_keeps_the_ban(self):
+        chat_url = 'https://www.nlvoorelkaar.nl/mijn-pagina/berichten/123'
+
+        self.storage.merge_remote('reminders', [[chat_url, '2025-01-10', '0'], [chat_url, '2025-01-10', '5']])
+
+        self.assertEqual(self.storage.get('reminders', chat_url), [chat_url, '2025-01-10', '0', '2025-01-10'])
+
+    def test_lone_ban_row_ends_its_round(self):
+        chat_url = 'https://www.nlvoorelkaar.nl/mijn-pagina/berichten/123'
+        other_chat_url = 'https://www.nlvoorelkaar.nl/mijn-pagina/berichten/124'
+
+        self.storage.merge_remote('reminders', [[chat_url, '2024-03-01', '5'], [other_chat_url, '2025-02-01', '2']])
+
+        self.assertEqual(self.storage.all('reminders'), [[chat_url, '2024-03-01', '4', '2024-03-01'],
+                                                         [other_chat_url, '2025-02-01', '2']])
+
+
+if __name__ == '__main__':
+    unittest.main()
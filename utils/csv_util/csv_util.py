@@ -1,10 +1,7 @@
-import csv
-import io
-from datetime import date, datetime
-
-from dateutil.relativedelta import relativedelta
-
 from google_drive.google_api_services import GoogleDriveManager
+from models.contactsstore import ContactsStore
+from models.reminderledger import ReminderLedger
+from services.campaignplanner import CampaignPlanner
 
 
 
@@ -12,41 +9,14 @@ def contact_date_to_csv(volunteer_id: str, drive_manager: GoogleDriveManager):
     """
     Update the last contact date for the volunteer with the given volunteer_id.
     If the volunteer_id is not found in the file, a new record will be added.
+    The update is made in the ContactsStore, the local storage pushes it to the file in the background.
 
     :param volunteer_id: The id of the volunteer.
     :param drive_manager: An instance of GoogleDriveReminderManager.
 
     :return: None
     """
-    today = date.today()
-    six_months_ago = today - relativedelta(months=6)
-    file_id = drive_manager.find_file_id_by_name("contacts_date.csv")
-    file_content = drive_manager.download_file_content(file_id)
-    rows = list(csv.reader(io.StringIO(file_content.decode('utf-8'))))
-
-    # Update existing record or add new record
-    updated = False
-    for i, row in enumerate(rows):
-        if len(row) >= 2 and row[0] == volunteer_id:
-            last_contact_date = datetime.strptime(row[1], '%Y-%m-%d').date()
-            if last_contact_date <= six_months_ago:
-                row[1] = today.strftime('%Y-%m-%d')  # Update date format
-                updated = True
-            break  # Stop reading after finding the volunteer_id
-
-    # Write updated rows back to the file
-    if updated:
-        file_content = io.StringIO()
-        writer = csv.writer(file_content)
-        writer.writerows(rows)
-        drive_manager.upload_file_content(file_content.getvalue().encode('utf-8'), "contacts_date.csv")
-    if not updated:  # Here's the logic to check for new volunteer_id
-        new_row = [volunteer_id, today.strftime('%Y-%m-%d')]
-        rows.append(new_row)  # Add new row to the in-memory list
-        file_content = io.StringIO()
-        writer = csv.writer(file_content)
-        writer.writerows(rows)  # Write updated list with new row
-        drive_manager.upload_file_content(file_content.getvalue().encode('utf-8'),  "contacts_date.csv")
+    ContactsStore().record_contact(volunteer_id)
 
 
 
@@ -61,24 +31,9 @@ def pre_send_message_check(volunteer_id: str, drive_manager: GoogleDriveManager)
 
     :return: True if the message can be sent, False otherwise.
     """
-    today = date.today()
-    six_months_ago = today - relativedelta(months=6)
-    file_id = drive_manager.find_file_id_by_name("contacts_date.csv")
-    file_content = drive_manager.download_file_content(file_id)
-    rows = []
-    if file_content:
-        file_stream = io.StringIO(file_content.decode('utf-8'))
-        reader = csv.reader(file_stream)
-        rows = list(reader)
-
-    last_contact_date = None
-    for i, row in enumerate(rows):
-        # Check if the row is empty before accessing elements
-        if len(row) > 0 and row[0] == volunteer_id:
-            last_contact_date = datetime.strptime(row[1], '%Y-%m-%d').date()
-            break  # Stop reading after finding the volunteer_id
-
-    if last_contact_date is None or last_contact_date <= six_months_ago:
+    contacts_store = ContactsStore()
+
+    if not contacts_store.was_contacted_recently(volunteer_id):
         if not check_if_volunteer_id_is_banned(volunteer_id, drive_manager):
             print(f"Sending message to volunteer with id {volunteer_id}")
             return True
@@ -86,7 +41,8 @@ def pre_send_message_check(volunteer_id: str, drive_manager: GoogleDriveManager)
             print(f"Cannot send message to volunteer with id {volunteer_id}: Volunteer is banned")
             return False
     else:
-        print(f"Cannot send message to volunteer with id {volunteer_id}: Last contact date is {last_contact_date}")
+        print(f"Cannot send message to volunteer with id {volunteer_id}: Last contact date is "
+              f"{contacts_store.get_last_contact(volunteer_id)}")
         return False
 
 def check_if_volunteer_id_is_banned(volunteer_id: str, drive_manager: GoogleDriveManager):
@@ -96,20 +52,11 @@ def check_if_volunteer_id_is_banned(volunteer_id: str, drive_manager: GoogleDriv
     :param volunteer_id: The id of the volunteer.
     :param drive_manager: An instance of GoogleDriveReminderManager.
 
-    :return: False if the volunteer is banned, True if he was banned more than 12 months ago or if he is not banned.
+    :return: True if the volunteer was banned less than 12 months ago, False if the ban expired or they are not
+             banned.
     """
-    today = date.today()
-    twelve_months_ago = today.replace(year=today.year - 1)
-    file_id = drive_manager.find_file_id_by_name("chats_no_response.csv")
-    file_content = drive_manager.download_file_content(file_id)
-    rows = list(csv.reader(io.StringIO(file_content.decode('utf-8'))))
-
-    for row in rows:
-        # Check if the row is empty before accessing elements
-        if len(row) > 0 and row[0].split('/')[-1] == volunteer_id and int(row[2]) > 4:
-            last_contact_date = datetime.strptime(row[1], '%Y-%m-%d').date()
-            return last_contact_date <= twelve_months_ago
-    return False
+    # The reminders are keyed by chat url, the chat ending with the volunteer_id is looked up in the index
+    return CampaignPlanner.is_banned(ReminderLedger().get_by_volunteer_ids([volunteer_id]).get(volunteer_id))
 
 
 
@@ -0,0 +1,60 @@
+import re
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    PARSER_BACKEND = 'lxml'
+except ImportError:
+    PARSER_BACKEND = 'html.parser'
+
+
+def _has_class(class_name: str):
+    """
+    Match a class attribute holding class_name among its classes. The strainers see the raw attribute string.
+    """
+    return re.compile(rf'(^|\s){re.escape(class_name)}(\s|$)')
+
+
+# The parts of the pages read by the scraping code. Passing one of these to parse_html builds only the matching
+# elements and their content, the rest of the document is skipped while parsing. The search result page has no
+# strainer: its cards, banner, key, count and next link are spread over too many tags for straining to pay off.
+VOLUNTEER_COUNT = SoupStrainer('span', {'class': _has_class('c-brush-underline__text')})
+MESSAGE_FORM = SoupStrainer('input', {'name': re.compile(r'^message\[')})
+LOGIN_FORM = SoupStrainer('input', {'name': '_csrf_token'})
+PROFILE_FORM = SoupStrainer('input', {'id': 'user_profile_firstName'})
+OFFER_PROFILE_LINK = SoupStrainer('div', {'class': _has_class('block--square')})
+INBOX_PAGINATOR = SoupStrainer('div', {'class': _has_class('paginator')})
+INBOX_NAMES = SoupStrainer('a', {'aria-labelledby': 'message-of-label'})
+INBOX_OFFER_LINKS = SoupStrainer('a', {'aria-labelledby': 'ad-label'})
+INBOX_CONVERSATIONS = SoupStrainer('li', {'class': _has_class('list__item--messages')})
+CONVERSATION_METAS = SoupStrainer('p', {'class': _has_class('conversation__meta')})
+CONVERSATION_DETAILS = SoupStrainer('dl', {'class': _has_class('list__definition')})
+
+
+def _is_offer_page_part(name, attrs) -> bool:
+    """
+    Match the parts of an offer page both OFFER_PROFILE_LINK and MESSAGE_FORM match, to read both from one parse.
+    """
+    if isinstance(name, str) and attrs is not None:
+        return OFFER_PROFILE_LINK.search_tag(name, attrs) is not None or MESSAGE_FORM.search_tag(name, attrs) is not None
+    return False
+
+
+OFFER_PAGE = SoupStrainer(_is_offer_page_part)
+
+
+def parse_html(markup, parse_only: Optional[SoupStrainer] = None, backend: Optional[str] = None) -> BeautifulSoup:
+    """
+    Parse an HTML page with the fastest parser available.
+
+    lxml is used when it is installed, html.parser otherwise. Both give the same BeautifulSoup interface.
+
+    :param markup: The page as text or bytes.
+    :param parse_only: One of the strainers of this module, to build only the nodes the caller reads.
+    :param backend: Overrides the parser, e.g. 'html.parser'.
+
+    :return: The parsed document.
+    """
+    return BeautifulSoup(markup, backend or PARSER_BACKEND, parse_only=parse_only)
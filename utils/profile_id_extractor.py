@@ -1,52 +1,84 @@
-import time
-
-import requests
-from bs4 import BeautifulSoup
-from cffi.cffi_opcode import PRIM_FLOAT
-
 from config.settings import headers
+from models.profileidcache import ProfileIdCache, PROFILE_ID, OFFER_URL
 from models.sessionmanager import SessionManager
+from utils.html_parser import parse_html, OFFER_PROFILE_LINK
+
+
+def get_offer_id(offer_url):
+    """
+    :return: The id of the offer in an offer url, e.g. 123 for https://www.nlvoorelkaar.nl/hulpaanbod/123?showMessage=1
+    """
+    return offer_url.split('?')[0].rstrip('/').split('/')[-1]
+
 
 def get_profile_id(offer_url):
+    """
+    Get the profile id of the volunteer of an offer. The id is looked up in the ProfileIdCache first, the offer page
+    is only loaded for offers that were never resolved.
+    """
+    if not offer_url:
+        return None
+    return ProfileIdCache().get(PROFILE_ID, get_offer_id(offer_url), lambda _: fetch_profile_id(offer_url))
+
+
+def get_offer_url_from_chat_page(chat_url):
+    """
+    Get the url of the offer a chat is about. The url is looked up in the ProfileIdCache first, the chat page is
+    only loaded for chats that were never resolved.
+    """
+    return ProfileIdCache().get(OFFER_URL, chat_url, fetch_offer_url_from_chat_page)
+
+
+def fetch_profile_id(offer_url):
     response = SessionManager.get_session().get(offer_url, headers=headers)
     # Check if the request was successful
     if response.status_code == 200:
         # Step 2: Parse the HTML content of the page
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = parse_html(response.content, OFFER_PROFILE_LINK)
+        return parse_profile_id(soup)
+    else:
+        print(f"Failed to retrieve the webpage. Status code: {response.status_code}")
+
 
-        # Step 3: Find the specific <div> element with the class "block block--small block--square text--center first"
-        target_div = soup.find('div', class_="block block--small block--square text--center first")
+def parse_profile_id(soup):
+    """
+    Read the profile id from a parsed offer page.
 
-        if target_div:
-            # Step 4: Inside this div, find the <div> element with the class "meta"
-            meta_div = target_div.find('div', class_="meta")
+    :param soup: The offer page, parsed with at least the OFFER_PROFILE_LINK part.
 
-            if meta_div:
-                # Step 5: Find the <a> tag inside the meta div
-                a_tag = meta_div.find('a')
+    :return: The profile id, or None if the page has no profile link.
+    """
+    # Step 3: Find the specific <div> element with the class "block block--small block--square text--center first"
+    target_div = soup.find('div', class_="block block--small block--square text--center first")
 
-                if a_tag:
-                    # Step 6: Get the href attribute of the <a> tag
-                    href = a_tag.get('href')
+    if target_div:
+        # Step 4: Inside this div, find the <div> element with the class "meta"
+        meta_div = target_div.find('div', class_="meta")
 
-                    id = href.strip("/").split("/")[1]
-                    print(f'Found profile_id: {href}')
-                    return id
-                else:
-                    print("No <a> tag found inside the meta div.")
+        if meta_div:
+            # Step 5: Find the <a> tag inside the meta div
+            a_tag = meta_div.find('a')
+
+            if a_tag:
+                # Step 6: Get the href attribute of the <a> tag
+                href = a_tag.get('href')
+
+                id = href.strip("/").split("/")[1]
+                print(f'Found profile_id: {href}')
+                return id
             else:
-                print("No div with class 'meta' found inside the target div.")
+                print("No <a> tag found inside the meta div.")
         else:
-            print("No div with class 'block block--small block--square text--center first' found.")
+            print("No div with class 'meta' found inside the target div.")
     else:
-        print(f"Failed to retrieve the webpage. Status code: {response.status_code}")
+        print("No div with class 'block block--small block--square text--center first' found.")
 
 
-def get_offer_url_from_chat_page(chat_url):
+def fetch_offer_url_from_chat_page(chat_url):
     response = SessionManager.get_session().get(chat_url, headers=headers)
     print("Checking offer url from chat url", chat_url)
     if response.status_code == 200:
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = parse_html(response.content)
 
         offer_dd = soup.select_one('#content > div.site-retain.react-dashboard-menu > div > div.col-span-9 > dl > dd:nth-child(4) > a')
         print(offer_dd)
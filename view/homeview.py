@@ -233,13 +233,10 @@ class HomeView(BaseView):
         total_volunteers_label.grid(row=0, column=0, sticky="nsew", pady=10, padx=10)
         self.widgets.append(total_volunteers_label)
 
-        self.total_volunteers = ctk.StringVar()
-
-        total_volunteers_count = self.service_manager.get_amount_of_volunteer(self.checkbox_vars,
-                                                                              self.location_ids_types,
-                                                                              self.location.get(),
-                                                                              self.distance.get())
-        self.total_volunteers.set(total_volunteers_count)
+        # The count is set by notify_amount_of_volunteer once the lookup is done
+        self.total_volunteers = ctk.StringVar(value="0")
+        self.service_manager.get_amount_of_volunteer(self.checkbox_vars, self.location_ids_types, self.location.get(),
+                                                     self.distance.get())
         total_volunteers_label = ctk.CTkLabel(total_volunteers_frame, font=("Arial", 30),
                                               textvariable=self.total_volunteers)
         total_volunteers_label.place(relx=0.5, rely=0.5, anchor="center")
@@ -359,6 +356,8 @@ class HomeView(BaseView):
             self.update_message_sent()
         elif service_id == 'notify_progress_message_sending':
             self.update_progress_bar_to_message_sending(data)
+        elif service_id == 'notify_campaign_plan':
+            self.update_campaign_plan(data)
 
     def update_option_menu(self, data):
         if len(data) == 0:
@@ -397,8 +396,10 @@ class HomeView(BaseView):
 
     def pre_send_message(self):
         self.show_loading_screen(0, False)
-        self.service_manager.get_volunteers(self.checkbox_vars, self.location_ids_types, self.location.get(),
-                                            self.distance.get())
+        self.service_manager.send_messages_to_volunteers(self.checkbox_vars, self.location_ids_types,
+                                                         self.location.get(), self.distance.get(),
+                                                         self.root_window.username, self.root_window.password,
+                                                         self.message.get("1.0", "end-1c"), self.phone.get())
 
     def send_message(self, data):
         self.clean_loading_frame()
@@ -413,6 +414,10 @@ class HomeView(BaseView):
         self.percent_var.set(f"Getting volunteers... {progress * 100:.1f}%")
         self.progress_bar.set(progress)
 
+    def update_campaign_plan(self, plan):
+        skipped = len(plan.skipped)
+        self.percent_var.set(f"{len(plan.sendable)} volunteers can be messaged, {skipped} skipped.")
+
     def update_message_sent(self):
         self.clean_loading_frame()
         self.clear_message_fields()
@@ -423,7 +428,7 @@ class HomeView(BaseView):
     def update_progress_bar_to_message_sending(self, data):
         total_volunteers = int(self.total_volunteers.get().replace('.', ''))
         self.percent_var.set(f"Messages Sent: {data} out of {self.total_volunteers.get()}.")
-        self.progress_bar.set(data / total_volunteers)
+        self.progress_bar.set(data / total_volunteers if total_volunteers else 0)
 
     def clear_message_fields(self):
         self.message.delete("1.0", "end-1c")